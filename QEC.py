@@ -1,252 +1,216 @@
+import os
 import sys
+import csv
+import hashlib
+import time
+import functools
+import itertools
+import contextlib
+import threading
+import tracemalloc
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import NormalDist
 import numpy as np
-import matplotlib.pyplot as plt
 import cirq
 import json
-from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QGridLayout, QFileDialog, QMessageBox,
-    QComboBox, QCheckBox, QScrollArea
-)
-from PyQt5.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import pandas as pd
+from qec_analysis import LatticeAnalysis, outcome_probabilities
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class Profiler:
+    """Named timing spans for the stages of a run.
+
+    Use `with profiler.span("simulate", shots=n): ...`. Every span records
+    wall time, CPU time of the calling thread and, where the resource module
+    exists, the process's peak RSS. Spans with the same name are summed. With
+    trace_memory, spans also record the peak traced allocation through
+    tracemalloc, which is slow. A disabled profiler returns one shared no-op
+    context, so instrumented code pays only a method call.
+    """
+
+    NULL_SPAN = contextlib.nullcontext()
+
+    def __init__(self, enabled=True, trace_memory=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def span(self, name, shots=None):
+        if not self.enabled:
+            return self.NULL_SPAN
+        return ProfilerSpan(self, name, shots)
+
+    def add(self, name, wall, cpu, shots, peak_traced):
+        with self.lock:
+            stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                  'shots': 0, 'peak_traced_mb': None})
+            stage['calls'] += 1
+            stage['wall_seconds'] += wall
+            stage['cpu_seconds'] += cpu
+            stage['shots'] += shots or 0
+            if peak_traced is not None:
+                stage['peak_traced_mb'] = max(stage['peak_traced_mb'] or 0.0, peak_traced / 2 ** 20)
+            stage['peak_rss_mb'] = self.peak_rss_mb()
 
-class QuantumErrorCorrectionSoftware(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("QEC - Simulator")
-        self.setGeometry(100, 100, 1400, 1000) 
-        self.layout = QVBoxLayout()
-        self.setLayout(self.layout)
-
-        # Parameters
-        self.lattice_size = 5
-        self.error_rate = 0.1
-        self.error_type = "Depolarizing"
-        self.visualization_style = "Coolwarm"
-        self.error_correction_algorithm = "None"
-
-        self.selected_visualizations = {}
-
-        self.circuit_manager = None
-        self.simulation_manager = None
-        self.visualization_manager = None
-
-        # GUI components
-        self.create_widgets()
-        self.visualization_manager = VisualizationManager(self.display_area)
-
-    def create_widgets(self):
-        self.title_label = QLabel("Quantum Error Correction Simulator", self)
-        self.title_label.setAlignment(Qt.AlignCenter)
-        self.title_label.setStyleSheet("font-size: 24px; font-weight: bold; padding: 10px; color: #34495E;")
-        self.layout.addWidget(self.title_label)
-
-        form_layout = QGridLayout()
-
-        # Parameters
-        form_layout.addWidget(QLabel("Lattice Size (NxN):"), 0, 0)
-        self.lattice_size_input = QLineEdit("5")
-        form_layout.addWidget(self.lattice_size_input, 0, 1)
-
-        form_layout.addWidget(QLabel("Error Rate (0 to 1):"), 1, 0)
-        self.error_rate_input = QLineEdit("0.1")
-        form_layout.addWidget(self.error_rate_input, 1, 1)
-
-        form_layout.addWidget(QLabel("Error Type:"), 2, 0)
-        self.error_type_combo = QComboBox()
-        self.error_type_combo.addItems(["Bit-flip", "Phase-flip", "Depolarizing"])
-        form_layout.addWidget(self.error_type_combo, 2, 1)
-
-        # Error visualization styles
-        form_layout.addWidget(QLabel("Visualization Style:"), 3, 0)
-        self.visualization_style_combo = QComboBox()
-        self.visualization_style_combo.addItems(["Coolwarm", "Viridis", "Plasma"])
-        form_layout.addWidget(self.visualization_style_combo, 3, 1)
-
-        # Error correction algorithms
-        form_layout.addWidget(QLabel("Error Correction Algorithm:"), 4, 0)
-        self.algorithm_combo = QComboBox()
-        self.algorithm_combo.addItems(["None", "Shor Code", "Steane Code"])
-        form_layout.addWidget(self.algorithm_combo, 4, 1)
-
-        # Visualizations selection
-        form_layout.addWidget(QLabel("Visualizations:"), 6, 0)
-        self.visualization_options = {
-            'Lattice Before Error Correction': QCheckBox('Lattice Before Error Correction'),
-            'Measurement Results': QCheckBox('Measurement Results'),
-            'Lattice After Error Correction': QCheckBox('Lattice After Error Correction'),
-            'Qubit State Probabilities': QCheckBox('Qubit State Probabilities'),
-            'Circuit Diagram': QCheckBox('Circuit Diagram')
-        }
-        visualizations_layout = QVBoxLayout()
-        for checkbox in self.visualization_options.values():
-            checkbox.setChecked(True) 
-            visualizations_layout.addWidget(checkbox)
-        form_layout.addLayout(visualizations_layout, 6, 1)
-
-        self.layout.addLayout(form_layout)
-
-        # Run Simulation Button
-        self.run_button = QPushButton("Run Simulation", self)
-        self.run_button.clicked.connect(self.run_simulation)
-        self.layout.addWidget(self.run_button)
-
-        # Load Simulation 
-        self.load_button = QPushButton("Load Simulation", self)
-        self.load_button.clicked.connect(self.load_simulation)
-        self.layout.addWidget(self.load_button)
-
-        # Save Simulation 
-        self.save_button = QPushButton("Save Simulation Results", self)
-        self.save_button.clicked.connect(self.save_simulation_results)
-        self.layout.addWidget(self.save_button)
-
-        # Display Area 
-        self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.display_area = QWidget()
-        self.scroll_area.setWidget(self.display_area)
-        self.layout.addWidget(self.scroll_area)
-
-    def run_simulation(self):
-        try:
-            # Get user input
-            self.lattice_size = int(self.lattice_size_input.text())
-            self.error_rate = float(self.error_rate_input.text())
-            self.error_type = self.error_type_combo.currentText()
-            self.visualization_style = self.visualization_style_combo.currentText()
-            self.error_correction_algorithm = self.algorithm_combo.currentText()
-
-            if not (0 <= self.error_rate <= 1):
-                raise ValueError("Error rate must be between 0 and 1.")
-        except ValueError as ve:
-            QMessageBox.warning(self, "Input Error", f"Invalid input: {ve}")
-            return
-
-        # Get visualization options
-        self.selected_visualizations = {name: checkbox.isChecked() for name, checkbox in self.visualization_options.items()}
-
-        # Clear previous display widgets in the display area
-        for widget in self.visualization_manager.display_area.findChildren(QWidget):
-            widget.deleteLater()
-
-        # Create the quantum circuit with errors injected
-        self.circuit_manager = CircuitManager(self.lattice_size, self.error_rate, self.error_type, self.error_correction_algorithm)
-        self.circuit_manager.apply_hadamard_and_cnot()
-        self.circuit_manager.inject_errors()
-
-        # Add measurements before the first simulation
-        self.circuit_manager.measure_stabilizers()
-
-        # Instantiate the simulation manager 
-        circuit = self.circuit_manager.get_circuit()
-        self.simulation_manager = SimulationManager(circuit)
-
-        # Visualize the lattice before error correction (if selected)
-        if self.selected_visualizations.get('Lattice Before Error Correction', False):
-            result_before = self.simulation_manager.run_simulation()
-            lattice_before_fig = self.simulation_manager.visualize_lattice(self.lattice_size, result_before, self.visualization_style)
-            self.visualization_manager.display_figure(lattice_before_fig, title="Lattice Before Error Correction")
-
-        else:
-            result_before = self.simulation_manager.run_simulation()
-
-        # Apply chosen error correction algorithm
-        self.apply_error_correction()  
-
-        # Add measurements for post-correction visualization
-        self.circuit_manager.measure_stabilizers_post_correction() 
-
-        # Run the simulation after correction
-        result_after = self.simulation_manager.run_simulation()
-
-        # Visualize the results after error correction
-        if self.selected_visualizations.get('Measurement Results', False):
-            measurement_fig = self.simulation_manager.visualize_measurement_results(result_after)
-            self.visualization_manager.display_figure(measurement_fig, title="Measurement Results")
-
-        if self.selected_visualizations.get('Lattice After Error Correction', False):
-            lattice_after_fig = self.simulation_manager.visualize_lattice(self.lattice_size, result_after, self.visualization_style)
-            self.visualization_manager.display_figure(lattice_after_fig, title="Lattice After Error Correction")
-
-
-        # Visualize the circuit diagram
-        if self.selected_visualizations.get('Circuit Diagram', False):
-            circuit_fig = self.visualize_circuit_graphically(circuit)  # Updated method for graphical visualization
-            self.visualization_manager.display_figure(circuit_fig, title="Circuit Diagram")
-
-    def apply_error_correction(self):
-        """Apply the selected error correction algorithm."""
-        if self.error_correction_algorithm == "Shor Code":
-            self.circuit_manager.apply_shor_code()
-        elif self.error_correction_algorithm == "Steane Code":
-            self.circuit_manager.apply_steane_code()
-
-    def visualize_circuit_graphically(self, circuit):
-        """Generate a visualization of the quantum circuit using Matplotlib."""
-        fig, ax = plt.subplots(figsize=(15, 6))  
-        ax.axis('off')  
-
-
-        circuit_diagram = circuit.to_text_diagram()  
-        ax.text(0.5, 0.5, circuit_diagram, family='monospace', fontsize=10, ha='center', va='center')
-        return fig
-
-    def save_simulation_results(self):
-        """Save the results of the simulation to a JSON file."""
-        if self.simulation_manager and self.simulation_manager.result_data:
-            file_path, _ = QFileDialog.getSaveFileName(self, "Save Results", "", "JSON Files (*.json)")
-            if file_path:
-                results = self.simulation_manager.result_data
-                LoggingManager.log_simulation_results(results, file_path)
-                QMessageBox.information(self, "Save Success", "Simulation results saved successfully.")
-        else:
-            QMessageBox.warning(self, "No Results", "No simulation results to save.")
-
-    def load_simulation(self):
-        """Load and display results from a previous simulation."""
-        file_path, _ = QFileDialog.getOpenFileName(self, "Load Results", "", "JSON Files (*.json)")
-        if file_path:
-            try:
-                results = LoggingManager.load_simulation_log(file_path)
-                QMessageBox.information(self, "Load Success", "Simulation results loaded successfully.")
-                circuit_fig = self.visualize_circuit_graphically(cirq.Circuit(cirq.Circuit.from_ops(cirq.read_json(json_text=results['circuit']))))
-                self.visualization_manager.display_figure(circuit_fig)
-                measurement_fig = self.simulation_manager.visualize_measurement_results_from_data(results['measurements'])
-                self.visualization_manager.display_figure(measurement_fig)
-                lattice_fig = self.simulation_manager.visualize_lattice_from_data(self.lattice_size, results['lattice'], self.visualization_style)
-                self.visualization_manager.display_figure(lattice_fig)
-            except Exception as e:
-                QMessageBox.warning(self, "Load Error", f"Failed to load simulation: {e}")
-
-
-class CircuitManager:
-    def __init__(self, size, error_rate, error_type, algorithm):
+    @staticmethod
+    def peak_rss_mb():
+        if resource is None:
+            return None
+        # Linux reports KiB, macOS bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+    def records(self):
+        """Return the stages in the order they first ran, as JSON-ready dicts."""
+        with self.lock:
+            stages = [dict(stage, name=name) for name, stage in self.stages.items()]
+        for stage in stages:
+            stage['shots_per_sec'] = stage['shots'] / stage['wall_seconds'] if stage['shots'] and stage['wall_seconds'] else None
+            if not stage['shots']:
+                stage['shots'] = None
+        return stages
+
+    def format_table(self):
+        """Render the stages as a fixed-width breakdown."""
+        lines = [f"{'stage':<20}{'calls':>6}{'wall s':>10}{'cpu s':>10}{'shots/s':>12}{'peak MiB':>10}"]
+        for stage in self.records():
+            rate = f"{stage['shots_per_sec']:>12.0f}" if stage['shots_per_sec'] else f"{'':>12}"
+            peak = stage['peak_traced_mb'] if stage['peak_traced_mb'] is not None else stage['peak_rss_mb']
+            peak = f"{peak:>10.1f}" if peak is not None else f"{'':>10}"
+            lines.append(f"{stage['name']:<20}{stage['calls']:>6}{stage['wall_seconds']:>10.4f}{stage['cpu_seconds']:>10.4f}{rate}{peak}")
+        return "\n".join(lines)
+
+
+class ProfilerSpan:
+    """One timed region of a Profiler; see Profiler.span."""
+
+    def __init__(self, profiler, name, shots):
+        self.profiler = profiler
+        self.name = name
+        self.shots = shots
+
+    def __enter__(self):
+        if self.profiler.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        peak_traced = tracemalloc.get_traced_memory()[1] if self.profiler.trace_memory else None
+        self.profiler.add(self.name, wall, cpu, self.shots, peak_traced)
+        return False
+
+
+class CircuitTemplate:
+    """Noiseless circuit skeleton for one (size, algorithm, rounds), built once and cached.
+
+    Each named segment (entangling layer, measurement layers, code encoding,
+    surface code rounds) is stored as a tuple of pre-built moments. Where noise
+    belongs, the segment holds a slot naming the qubits it acts on. bind()
+    fills the slots with moments of a given channel, so changing the error
+    rate or type only swaps those moments and does not rebuild the circuit.
+    Bound segments share their noiseless moments with the template. Only the
+    CACHE_SIZE most recently used bindings are kept, and only the
+    CACHE_SIZE most recently used templates.
+    """
+
+    NOISE = 'noise'
+    READOUT_NOISE = 'readout noise'
+    CACHE_SIZE = 16
+
+    def __init__(self, size, algorithm, rounds=None):
         self.size = size
-        self.error_rate = error_rate
-        self.error_type = error_type
         self.algorithm = algorithm
-        self.qubits = [cirq.GridQubit(i, j) for i in range(size) for j in range(size)]
-        self.circuit = cirq.Circuit()
+        self.rounds = rounds
+        if algorithm == "Surface Code":
+            # Data qubits on odd coordinates, stabilizer ancillas on even ones
+            self.qubits = [cirq.GridQubit(2 * i + 1, 2 * j + 1) for i in range(size) for j in range(size)]
+            self.stabilizers = CircuitManager.surface_code_stabilizers(size)
+        else:
+            self.qubits = [cirq.GridQubit(i, j) for i in range(size) for j in range(size)]
+            self.stabilizers = None
+        self.segments = {}
+        self.bound = OrderedDict()
 
-    def apply_hadamard_and_cnot(self):
-        """Apply Hadamard and CNOT gates to initialize the lattice."""
-        for qubit in self.qubits:
-            self.circuit.append(cirq.H(qubit))
+    @classmethod
+    @functools.lru_cache(maxsize=CACHE_SIZE)
+    def for_lattice(cls, size, algorithm, rounds=None):
+        return cls(size, algorithm, rounds if algorithm == "Surface Code" else None)
 
+    @staticmethod
+    def moments_from(operations):
+        """Pack operations into moments the way Circuit.append's EARLIEST strategy would."""
+        layers, next_free = [], {}
+        for operation in operations:
+            index = max((next_free.get(qubit, 0) for qubit in operation.qubits), default=0)
+            if index == len(layers):
+                layers.append([])
+            layers[index].append(operation)
+            for qubit in operation.qubits:
+                next_free[qubit] = index + 1
+        return tuple(cirq.Moment(layer) for layer in layers)
+
+    def segment(self, name):
+        """Return the moments and noise slots of a segment, building it on first use."""
+        if name not in self.segments:
+            self.segments[name] = getattr(self, f'build_{name}')()
+        return self.segments[name]
+
+    def bind(self, name, noise, readout_noise=None):
+        """Return a segment's moments with its noise slots filled by the given channels."""
+        segment = self.segment(name)
+        if all(isinstance(item, cirq.Moment) for item in segment):
+            return segment
+        key = (name, noise, readout_noise)
+        if key in self.bound:
+            self.bound.move_to_end(key)
+            return self.bound[key]
+        moments = []
+        for item in segment:
+            if isinstance(item, cirq.Moment):
+                moments.append(item)
+            else:
+                kind, qubits = item
+                channel = noise if kind == self.NOISE else readout_noise
+                moments.append(cirq.Moment(channel.on(qubit) for qubit in qubits))
+        self.bound[key] = tuple(moments)
+        if len(self.bound) > self.CACHE_SIZE:
+            self.bound.popitem(last=False)
+        return self.bound[key]
+
+    def build_entangle(self):
+        """Hadamard and CNOT gates that initialize the lattice."""
+        operations = [cirq.H(qubit) for qubit in self.qubits]
         for i in range(self.size):
             for j in range(self.size):
                 q = cirq.GridQubit(i, j)
                 if i + 1 < self.size:
-                    q_right = cirq.GridQubit(i + 1, j)
-                    self.circuit.append(cirq.CNOT(q, q_right))
+                    operations.append(cirq.CNOT(q, cirq.GridQubit(i + 1, j)))
                 if j + 1 < self.size:
-                    q_down = cirq.GridQubit(i, j + 1)
-                    self.circuit.append(cirq.CNOT(q, q_down))
+                    operations.append(cirq.CNOT(q, cirq.GridQubit(i, j + 1)))
+        return self.moments_from(operations)
 
-    def apply_shor_code(self):
-        """Apply Shor's error correction code to the circuit."""
+    def build_noise(self):
+        return ((self.NOISE, tuple(self.qubits)),)
+
+    def build_measure_step1(self):
+        return self.moments_from(cirq.measure(qubit, key=f'm{i}_step1') for i, qubit in enumerate(self.qubits))
+
+    def build_measure_step2(self):
+        return self.moments_from(cirq.measure(qubit, key=f'm{i}_step2') for i, qubit in enumerate(self.qubits))
+
+    def build_shor_code(self):
+        """Shor's error correction code."""
         # Encode logical qubit using bit-flip repetition (3 qubits)
         if len(self.qubits) < 9:
             raise ValueError("Shor's code requires at least 9 qubits.")
@@ -255,131 +219,1487 @@ class CircuitManager:
         physical_qubits = self.qubits[:9]
 
         # Bit-flip repetition
-        self.circuit.append(cirq.CNOT(logical_qubit, physical_qubits[1]))
-        self.circuit.append(cirq.CNOT(logical_qubit, physical_qubits[2]))
+        operations = [cirq.CNOT(logical_qubit, physical_qubits[1]), cirq.CNOT(logical_qubit, physical_qubits[2])]
 
         # Phase-flip repetition on each of the three qubits
         for i in range(0, 9, 3):
-            self.circuit.append(cirq.H(physical_qubits[i]))
-            self.circuit.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 1]))
-            self.circuit.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 2]))
-            self.circuit.append(cirq.H(physical_qubits[i]))
+            operations.append(cirq.H(physical_qubits[i]))
+            operations.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 1]))
+            operations.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 2]))
+            operations.append(cirq.H(physical_qubits[i]))
 
         # Measure stabilizers (error syndromes)
         for i in range(3):
-            self.circuit.append(cirq.measure(physical_qubits[i * 3:(i + 1) * 3], key=f'syndrome_{i}'))
+            operations.append(cirq.measure(physical_qubits[i * 3:(i + 1) * 3], key=f'syndrome_{i}'))
 
-        # Simple error correction based on measured syndromes 
+        # Simple error correction based on measured syndromes
         for i in range(3):
-            self.circuit.append(cirq.CNOT(physical_qubits[i * 3], physical_qubits[i * 3 + 1]))
-            self.circuit.append(cirq.CNOT(physical_qubits[i * 3], physical_qubits[i * 3 + 2]))
+            operations.append(cirq.CNOT(physical_qubits[i * 3], physical_qubits[i * 3 + 1]))
+            operations.append(cirq.CNOT(physical_qubits[i * 3], physical_qubits[i * 3 + 2]))
+        return self.moments_from(operations)
 
-    def apply_steane_code(self):
-        """Apply Steane's error correction code to the circuit."""
+    def build_steane_code(self):
+        """Steane's error correction code."""
         # Encode 1 qubit into 7 physical qubits
         if len(self.qubits) < 7:
             raise ValueError("Steane's code requires at least 7 qubits.")
 
-        logical_qubit = self.qubits[0]
         physical_qubits = self.qubits[:7]
 
         # Apply Hadamard and CNOT gates to encode the logical qubit
-        for qubit in physical_qubits:
-            self.circuit.append(cirq.H(qubit))
+        operations = [cirq.H(qubit) for qubit in physical_qubits]
 
         # Apply encoding stabilizers
         for i in range(3):
-            self.circuit.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 3]))
+            operations.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 3]))
 
         # Measure stabilizers to detect errors
         for i in range(3):
-            self.circuit.append(cirq.measure(physical_qubits[i * 2:(i + 1) * 2], key=f'syndrome_{i}'))
+            operations.append(cirq.measure(physical_qubits[i * 2:(i + 1) * 2], key=f'syndrome_{i}'))
 
-        # Simple error correction based on syndromes 
+        # Simple error correction based on syndromes
         for i in range(3):
-            self.circuit.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 3]))
+            operations.append(cirq.CNOT(physical_qubits[i], physical_qubits[i + 3]))
+        return self.moments_from(operations)
+
+    @functools.cached_property
+    def surface_code_layers(self):
+        """The (reset, Hadamard, CNOT steps) moments and the ancillas of one surface code round.
+
+        The CNOT order (Z ancillas NW-NE-SW-SE, X ancillas NW-SW-NE-SE) lets
+        overlapping X and Z checks be measured in parallel.
+        """
+        ancillas = [ancilla for _, ancilla, _ in self.stabilizers]
+        x_ancillas = [ancilla for kind, ancilla, _ in self.stabilizers if kind == 'X']
+
+        steps = []
+        for step in range(4):
+            operations = []
+            for kind, ancilla, neighbours in self.stabilizers:
+                data = neighbours[(0, 1, 2, 3)[step] if kind == 'Z' else (0, 2, 1, 3)[step]]
+                if data is not None:
+                    operations.append(cirq.CNOT(data, ancilla) if kind == 'Z' else cirq.CNOT(ancilla, data))
+            steps.append(cirq.Moment(operations))
+        hadamards = cirq.Moment(cirq.H(ancilla) for ancilla in x_ancillas)
+        resets = cirq.Moment(cirq.reset(ancilla) for ancilla in ancillas)
+        return resets, hadamards, steps, ancillas
+
+    def surface_code_round(self, key, reset):
+        resets, hadamards, steps, ancillas = self.surface_code_layers
+        items = [resets] if reset else []
+        items.append((self.NOISE, tuple(self.qubits)))
+        items.extend([hadamards, *steps, hadamards])
+        items.append((self.READOUT_NOISE, tuple(ancillas)))
+        items.append(cirq.Moment([cirq.measure(*ancillas, key=key)]))
+        return items
+
+    def build_surface_code(self):
+        """`rounds` rounds of X/Z stabilizer extraction on the rotated surface code."""
+        items = []
+        for round_index in range(self.rounds):
+            items.extend(self.surface_code_round(f'syndrome_r{round_index}', reset=round_index > 0))
+        return tuple(items)
+
+    def build_surface_code_round(self):
+        """A single round measured under the key 'syndrome', repeated by syndrome streaming.
+
+        The leading reset is a no-op on the first round's fresh ancillas.
+        """
+        return tuple(self.surface_code_round('syndrome', reset=True))
+
+
+class CircuitManager:
+    def __init__(self, size, error_rate, error_type, algorithm, rounds=None):
+        if algorithm == "Surface Code" and size < 2:
+            raise ValueError("The surface code needs a distance (lattice size) of at least 2.")
+        self.size = size
+        self.error_rate = error_rate
+        self.error_type = error_type
+        self.algorithm = algorithm
+        self.rounds = size if rounds is None else rounds
+        # The noiseless skeleton is shared by every manager with the same lattice
+        self.template = CircuitTemplate.for_lattice(size, algorithm, self.rounds)
+        self.qubits = self.template.qubits
+        if algorithm == "Surface Code":
+            self.stabilizers = self.template.stabilizers
+        self.moments = []
+        self._circuit = None
+        self.decoder = None
+
+    @property
+    def circuit(self):
+        if self._circuit is None:
+            self._circuit = cirq.Circuit.from_moments(*self.moments)
+        return self._circuit
+
+    def append_segment(self, name):
+        """Append a template segment with its noise slots bound to the selected error."""
+        readout_noise = cirq.bit_flip(self.error_rate) if name.startswith('surface_code') else None
+        self.moments.extend(self.template.bind(name, self.noise_channel(), readout_noise))
+        self._circuit = None
+
+    def apply_hadamard_and_cnot(self):
+        """Apply Hadamard and CNOT gates to initialize the lattice."""
+        self.append_segment('entangle')
+
+    def apply_shor_code(self):
+        """Apply Shor's error correction code to the circuit."""
+        self.append_segment('shor_code')
+
+    def apply_steane_code(self):
+        """Apply Steane's error correction code to the circuit."""
+        self.append_segment('steane_code')
+
+    @staticmethod
+    def surface_code_stabilizers(size):
+        """Lay out the stabilizers of a distance-`size` rotated surface code.
+
+        Returns a list of (kind, ancilla, neighbours) where kind is 'X' or 'Z'
+        and neighbours holds the NW, NE, SW and SE data qubits (None where the
+        plaquette is cut by a boundary). X boundaries run along the top and
+        bottom, Z boundaries along the left and right.
+        """
+        stabilizers = []
+        for a in range(size + 1):
+            for b in range(size + 1):
+                kind = 'X' if (a + b) % 2 == 0 else 'Z'
+                on_top_or_bottom = a in (0, size) and 0 < b < size
+                on_left_or_right = b in (0, size) and 0 < a < size
+                bulk = 0 < a < size and 0 < b < size
+                if not (bulk or (on_top_or_bottom and kind == 'X') or (on_left_or_right and kind == 'Z')):
+                    continue
+                neighbours = [
+                    cirq.GridQubit(2 * i + 1, 2 * j + 1) if 0 <= i < size and 0 <= j < size else None
+                    for i, j in ((a - 1, b - 1), (a - 1, b), (a, b - 1), (a, b))
+                ]
+                stabilizers.append((kind, cirq.GridQubit(2 * a, 2 * b), neighbours))
+        return stabilizers
+
+    def apply_surface_code(self):
+        """Run `rounds` rounds of X/Z stabilizer extraction on the rotated surface code.
+
+        Each round injects the selected error on every data qubit, measures all
+        stabilizers through their ancillas and flips each ancilla readout with
+        the same error rate.
+        """
+        self.append_segment('surface_code')
+
+    def surface_code_decoding_graph(self):
+        """Build the memory-Z decoding graph over the Z stabilizers.
+
+        Detector (t, k) compares Z stabilizer k between round t and t - 1; the
+        last layer compares the final data readout with the last round. Returns
+        (num_detectors, edges) where edges are (u, v, flips_logical) and
+        v == num_detectors is the boundary.
+        """
+        z_stabilizers = [neighbours for kind, _, neighbours in self.stabilizers if kind == 'Z']
+        num_checks = len(z_stabilizers)
+        num_detectors = (self.rounds + 1) * num_checks
+        checks_of = {qubit: [k for k, neighbours in enumerate(z_stabilizers) if qubit in neighbours] for qubit in self.qubits}
+        logical_row = set(self.qubits[:self.size])
+
+        edges = []
+        for t in range(self.rounds):
+            for qubit in self.qubits:
+                nodes = [t * num_checks + k for k in checks_of[qubit]]
+                if len(nodes) == 1:
+                    nodes.append(num_detectors)
+                edges.append((nodes[0], nodes[1], qubit in logical_row))
+            for k in range(num_checks):
+                edges.append((t * num_checks + k, (t + 1) * num_checks + k, False))
+        return num_detectors, edges
+
+    def surface_code_detection_events(self, flips, repetitions):
+        """Turn noise-induced measurement flips into (detectors, logical_flips) bool arrays."""
+        z_rows = [k for k, (kind, _, _) in enumerate(self.stabilizers) if kind == 'Z']
+        z_data = [[self.qubits.index(q) for q in neighbours if q is not None]
+                  for kind, _, neighbours in self.stabilizers if kind == 'Z']
+
+        def unpack(packed):
+            return np.unpackbits(packed, axis=-1, count=repetitions, bitorder='little').astype(bool)
+
+        data = np.stack([unpack(flips[f'm{i}_step2'][-1, 0]) for i in range(len(self.qubits))])
+        layers = [unpack(flips[f'syndrome_r{t}'][-1, z_rows]) for t in range(self.rounds)]
+        layers.append(np.stack([np.bitwise_xor.reduce(data[rows], axis=0) for rows in z_data]))
+
+        detectors = [layers[0]] + [layers[t] ^ layers[t - 1] for t in range(1, len(layers))]
+        logical_flips = np.bitwise_xor.reduce(data[:self.size], axis=0)
+        return np.concatenate(detectors).T, logical_flips
+
+    def stream_detection_events(self, sampler, repetitions, consumer, chunk_rounds=16):
+        """Run `rounds` surface code rounds one at a time, streaming detection events to consumer.
+
+        The rounds are fed through a PauliFrameSimulator's advance() as one
+        repeated template segment. Only the frames and the previous round's Z
+        syndromes are kept, so memory does not grow with the number of rounds.
+        Every chunk_rounds rounds, consumer(first_round, events) receives the
+        detection events of those rounds as a bit-packed uint8 array of shape
+        (rounds, Z stabilizers, ceil(repetitions / 8)), laid out like the rows
+        of PauliFrameSimulator.sample_packed. The last chunk ends with the
+        layer comparing the final data readout with the last round, as in
+        surface_code_decoding_graph. Returns the packed logical flips of the
+        top data row.
+        """
+        if self.algorithm != "Surface Code":
+            raise ValueError("Syndrome streaming needs the Surface Code algorithm.")
+        round_moments = self.template.bind('surface_code_round', self.noise_channel(), cirq.bit_flip(self.error_rate))
+        readout_moments = self.template.bind('measure_step2', self.noise_channel())
+
+        qubits = sorted(set(self.qubits) | {ancilla for _, ancilla, _ in self.stabilizers})
+        index = {qubit: i for i, qubit in enumerate(qubits)}
+        num_bytes = (repetitions + 7) // 8
+        x = np.zeros((len(qubits), num_bytes), dtype=np.uint8)
+        z = np.zeros_like(x)
+        z_rows = [k for k, (kind, _, _) in enumerate(self.stabilizers) if kind == 'Z']
+        z_data = [[self.qubits.index(q) for q in neighbours if q is not None]
+                  for kind, _, neighbours in self.stabilizers if kind == 'Z']
+
+        previous = np.zeros((len(z_rows), num_bytes), dtype=np.uint8)
+        chunk = []
+        for round_index in range(self.rounds):
+            records = {}
+            sampler.advance(round_moments, index, x, z, repetitions, records)
+            syndrome = records['syndrome'][-1][z_rows]
+            chunk.append(syndrome ^ previous)
+            previous = syndrome
+            if len(chunk) == chunk_rounds:
+                consumer(round_index + 1 - len(chunk), np.stack(chunk))
+                chunk = []
+
+        records = {}
+        sampler.advance(readout_moments, index, x, z, repetitions, records)
+        data = np.stack([records[f'm{i}_step2'][-1][0] for i in range(len(self.qubits))])
+        chunk.append(np.stack([np.bitwise_xor.reduce(data[rows], axis=0) for rows in z_data]) ^ previous)
+        consumer(self.rounds + 1 - len(chunk), np.stack(chunk))
+        return np.bitwise_xor.reduce(data[:self.size], axis=0)
 
     def inject_errors(self):
-        """Inject random errors based on user-selected error type."""
-        for qubit in self.qubits:
-            rand_val = np.random.rand()
-            if self.error_type == "Bit-flip" and rand_val < self.error_rate:
-                self.circuit.append(cirq.X(qubit))
-            elif self.error_type == "Phase-flip" and rand_val < self.error_rate:
-                self.circuit.append(cirq.Z(qubit))
-            elif self.error_type == "Depolarizing":
-                if rand_val < self.error_rate:
-                    self.circuit.append(cirq.X(qubit))
-                elif rand_val < 2 * self.error_rate:
-                    self.circuit.append(cirq.Z(qubit))
-                elif rand_val < 3 * self.error_rate:
-                    self.circuit.append(cirq.Y(qubit))
+        """Inject a noise channel on every qubit based on user-selected error type.
+
+        Errors are sampled independently for every shot by the simulator rather
+        than once while the circuit is built.
+        """
+        self.append_segment('noise')
+
+    def noise_channel(self):
+        """Build the single-qubit Pauli channel for the selected error type and rate."""
+        p = self.error_rate
+        if self.error_type == "Bit-flip":
+            return cirq.bit_flip(p)
+        if self.error_type == "Phase-flip":
+            return cirq.phase_flip(p)
+        if self.error_type == "Depolarizing":
+            # X, Z and Y each with probability p, truncated so the total stays <= 1
+            p_x = min(p, 1.0)
+            p_z = min(2 * p, 1.0) - p_x
+            p_y = min(3 * p, 1.0) - p_x - p_z
+            return cirq.asymmetric_depolarize(p_x=p_x, p_y=p_y, p_z=p_z)
+        raise ValueError(f"Unknown error type '{self.error_type}'.")
 
     def measure_stabilizers(self):
         """Measure stabilizers using unique measurement keys."""
-        for i, qubit in enumerate(self.qubits):
-            self.circuit.append(cirq.measure(qubit, key=f'm{i}_step1'))
+        self.append_segment('measure_step1')
 
     def measure_stabilizers_post_correction(self):
         """Measure stabilizers with unique keys after error correction."""
-        for i, qubit in enumerate(self.qubits):
-            self.circuit.append(cirq.measure(qubit, key=f'm{i}_step2'))
+        self.append_segment('measure_step2')
+
+    def apply_error_correction(self):
+        """Apply the selected error correction algorithm."""
+        if self.algorithm == "Shor Code":
+            self.apply_shor_code()
+        elif self.algorithm == "Steane Code":
+            self.apply_steane_code()
+
+    def build_circuit(self):
+        """Build the full noisy circuit: entangling layer, errors, correction and both measurement layers."""
+        if self.algorithm == "Surface Code":
+            self.apply_surface_code()
+            self.measure_stabilizers_post_correction()
+            return self.circuit
+        self.apply_hadamard_and_cnot()
+        self.inject_errors()
+        self.measure_stabilizers()
+        self.apply_error_correction()
+        self.measure_stabilizers_post_correction()
+        return self.circuit
+
+    def sample_logical_errors(self, sampler, repetitions):
+        """Return a bool array flagging the shots whose logical qubit was flipped by noise.
+
+        Without a code the logical qubit is the first lattice qubit, and any
+        bit or phase flip on it counts. For the Shor and Steane codes the code
+        block's bit and phase flips right after the noise layer are decoded
+        separately with the cached lookup tables. These decoders stand in for
+        the fixed post-syndrome CNOTs. For the surface code memory experiment,
+        the logical Z parity of the top data row is compared with the
+        decoder's prediction. Phase flips cannot change that parity.
+        """
+        flips, phases = sampler.sample_frames(self.circuit, repetitions)
+
+        def unpack(packed):
+            return np.unpackbits(packed, axis=-1, count=repetitions, bitorder='little').astype(bool)
+
+        if self.algorithm in LookupTableDecoder.CODES:
+            errors = np.zeros(repetitions, dtype=bool)
+            for error, frames in (('X', flips), ('Z', phases)):
+                decoder = LookupTableDecoder.for_code(self.algorithm, error)
+                block = decoder.checks.shape[1]
+                readout = unpack(np.stack([frames[f'm{i}_step1'][-1, 0] for i in range(block)])).T
+                errors |= decoder.decode_batch(readout)[1]
+            return errors
+        if self.algorithm == "Surface Code":
+            if self.decoder is None:
+                self.decoder = UnionFindDecoder(*self.surface_code_decoding_graph())
+            detectors, logical_flips = self.surface_code_detection_events(flips, repetitions)
+            return self.decoder.decode_batch(detectors) ^ logical_flips
+        return unpack(flips['m0_step2'][-1, 0]) | unpack(phases['m0_step2'][-1, 0])
+
+    def count_logical_errors(self, seed, repetitions):
+        return int(self.sample_logical_errors(PauliFrameSimulator(seed), repetitions).sum())
+
+    def logical_error_rate(self, repetitions, seed=None, batch_shots=10 ** 4, workers=1):
+        """Estimate the decoded logical error rate from separate noise frames.
+
+        The frames are sampled and decoded batch_shots at a time, as in
+        SweepManager.run_point, so memory does not grow with the repetitions.
+        Batch i is seeded by the i-th child of the seed, so with workers > 1
+        the batches run over a process pool and give the same rate.
+        """
+        batches = [min(batch_shots, repetitions - start) for start in range(0, repetitions, batch_shots)]
+        seeds = np.random.SeedSequence(seed).spawn(len(batches))
+        if workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+                errors = sum(executor.map(self.count_logical_errors, seeds, batches))
+        else:
+            errors = sum(itertools.starmap(self.count_logical_errors, zip(seeds, batches)))
+        return errors / repetitions
 
     def get_circuit(self):
         return self.circuit
 
 
+class DetectionEventStatistics:
+    """Running detection-event counts, a consumer for CircuitManager.stream_detection_events.
+
+    Keeps per-stabilizer totals and one packed "any event" row over the
+    shots, so its memory is independent of the number of rounds.
+    """
+
+    def __init__(self, repetitions):
+        self.repetitions = repetitions
+        self.layers = 0
+        self.counts = None
+        self.any_event = None
+
+    def __call__(self, first_round, events):
+        counts = np.unpackbits(events, axis=-1, count=self.repetitions, bitorder='little').sum(axis=(0, 2), dtype=np.int64)
+        if self.counts is None:
+            self.counts = np.zeros(len(counts), dtype=np.int64)
+            self.any_event = np.zeros(events.shape[-1], dtype=np.uint8)
+        self.counts += counts
+        self.any_event |= np.bitwise_or.reduce(events, axis=(0, 1))
+        self.layers += len(events)
+
+    def stabilizer_rates(self):
+        """Fraction of layers and shots in which each Z stabilizer fired."""
+        return self.counts / (self.layers * self.repetitions)
+
+    def detection_rate(self):
+        return self.counts.sum() / (self.layers * len(self.counts) * self.repetitions)
+
+    def shots_with_events(self):
+        return int(np.unpackbits(self.any_event, count=self.repetitions, bitorder='little').sum())
+
+
+class UnionFindDecoder:
+    """Delfosse-Nickerson union-find decoder on a detector graph.
+
+    Clusters grow around defects by half-edges until every cluster has even
+    parity or touches the boundary, then a spanning forest of each cluster is
+    peeled to pick the correction. Only the clusters around defects are ever
+    touched, so cost is near-linear in the number of defects.
+    """
+
+    def __init__(self, num_detectors, edges):
+        self.num_detectors = num_detectors
+        self.boundary = num_detectors
+        self.edges = [(u, v) for u, v, _ in edges]
+        self.edge_flips_logical = [bool(flips) for _, _, flips in edges]
+        self.adjacency = [[] for _ in range(num_detectors + 1)]
+        for e, (u, v) in enumerate(self.edges):
+            self.adjacency[u].append(e)
+            self.adjacency[v].append(e)
+
+        # Padded neighbour table over the first edge between each pair of detectors;
+        # padding points at the boundary, which is never a defect
+        pairs = {}
+        for (u, v), flips in zip(self.edges, self.edge_flips_logical):
+            if self.boundary not in (u, v):
+                pairs.setdefault((min(u, v), max(u, v)), flips)
+        neighbours = [[] for _ in range(num_detectors)]
+        for (u, v), flips in pairs.items():
+            neighbours[u].append((v, flips))
+            neighbours[v].append((u, flips))
+        width = max((len(row) for row in neighbours), default=0)
+        self.neighbours = np.full((num_detectors, width), self.boundary, dtype=np.intp)
+        self.neighbour_flips = np.zeros((num_detectors, width), dtype=bool)
+        for u, row in enumerate(neighbours):
+            for k, (v, flips) in enumerate(row):
+                self.neighbours[u, k] = v
+                self.neighbour_flips[u, k] = flips
+
+        # Everything within two edges of each detector, padded the same way
+        vicinity = [sorted({w for v, _ in row for w, _ in neighbours[v]} | {v for v, _ in row}) for row in neighbours]
+        vicinity = [[v for v in row if v != u] for u, row in enumerate(vicinity)]
+        width = max((len(row) for row in vicinity), default=0)
+        self.vicinity = np.full((num_detectors, width), self.boundary, dtype=np.intp)
+        for u, row in enumerate(vicinity):
+            self.vicinity[u, :len(row)] = row
+
+    def decode_batch(self, detectors):
+        """Decode a (shots, num_detectors) bool array into per-shot logical flip predictions.
+
+        A vectorized pass first matches isolated defect pairs (two defects
+        joined by an edge with no other defect within two edges of either)
+        across the whole batch, as union-find would in its first growth step.
+        Union-find then only runs on what is left, once per distinct residual
+        syndrome.
+        """
+        detectors = np.asarray(detectors, dtype=bool)
+        predictions, residual = self._match_isolated_pairs(detectors)
+
+        remaining = np.flatnonzero(residual.any(axis=1))
+        packed = np.ascontiguousarray(np.packbits(residual[remaining], axis=1))
+        # Viewing each packed row as one opaque value makes the dedupe a 1-D sort
+        rows = packed.view(np.dtype((np.void, packed.shape[1]))).reshape(-1)
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        unique_predictions = np.array(
+            [self.decode(np.flatnonzero(residual[remaining[i]])) for i in first], dtype=bool)
+        predictions[remaining] ^= unique_predictions[inverse.reshape(-1)]
+        return predictions
+
+    def _match_isolated_pairs(self, detectors):
+        shots = detectors.shape[0]
+        shot, node = np.nonzero(detectors)
+        padded = np.zeros((shots, self.num_detectors + 1), dtype=bool)
+        padded[:, :-1] = detectors
+
+        neighbour_defects = padded[shot[:, None], self.neighbours[node]]
+        counts = np.zeros(padded.shape, dtype=np.int8)
+        counts[shot, node] = padded[shot[:, None], self.vicinity[node]].sum(axis=1)
+
+        # A count of one means the only defect nearby is the adjacent partner
+        k = neighbour_defects.argmax(axis=1)
+        partner = self.neighbours[node, k]
+        matched = neighbour_defects.any(axis=1) & (counts[shot, node] == 1) & (counts[shot, partner] == 1)
+
+        # Each pair is seen from both ends; count its logical flip once
+        flips = matched & (node < partner) & self.neighbour_flips[node, k]
+        predictions = np.bincount(shot[flips], minlength=shots) % 2 == 1
+        residual = detectors.copy()
+        residual[shot[matched], node[matched]] = False
+        return predictions, residual
+
+    def decode(self, defects):
+        """Return True if the correction for the given defect nodes flips the logical observable."""
+        if len(defects) == 0:
+            return False
+        num_nodes = self.num_detectors + 1
+        parent = list(range(num_nodes))
+        parity = bytearray(num_nodes)
+        boundary = bytearray(num_nodes)
+        boundary[self.boundary] = 1
+        in_cluster = bytearray(num_nodes)
+        in_cluster[self.boundary] = 1
+        support = bytearray(len(self.edges))
+        frontier = {self.boundary: []}
+        edges, adjacency = self.edges, self.adjacency
+
+        def find(v):
+            root = v
+            while parent[root] != root:
+                root = parent[root]
+            while parent[v] != root:
+                parent[v], v = root, parent[v]
+            return root
+
+        for v in defects:
+            parity[v] = in_cluster[v] = 1
+            frontier[v] = [v]
+        active = set(frontier) - {self.boundary}
+        fully_grown = []
+
+        # Grow odd clusters by half-edges until all are neutral
+        while active:
+            grown = []
+            for root in active:
+                still_open = []
+                for v in frontier[root]:
+                    has_open_edge = False
+                    for e in adjacency[v]:
+                        if support[e] < 2:
+                            support[e] += 1
+                            if support[e] == 2:
+                                grown.append(e)
+                            else:
+                                has_open_edge = True
+                    if has_open_edge:
+                        still_open.append(v)
+                frontier[root] = still_open
+            fully_grown.extend(grown)
+            for e in grown:
+                u, v = edges[e]
+                for w in (u, v):
+                    if not in_cluster[w]:
+                        in_cluster[w] = 1
+                        frontier[w] = [w]
+                u, v = find(u), find(v)
+                if u == v:
+                    continue
+                if len(frontier[u]) < len(frontier[v]):
+                    u, v = v, u
+                parent[v] = u
+                parity[u] ^= parity[v]
+                boundary[u] |= boundary[v]
+                frontier[u].extend(frontier.pop(v))
+            active = {root for root in map(find, active) if parity[root] and not boundary[root]}
+
+        # Peel a spanning forest of the grown edges, rooted at the boundary where possible
+        tree_edges = {}
+        for e in fully_grown:
+            u, v = edges[e]
+            tree_edges.setdefault(u, []).append((e, v))
+            tree_edges.setdefault(v, []).append((e, u))
+        roots = sorted(tree_edges, key=lambda v: v != self.boundary)
+        visited = bytearray(num_nodes)
+        order, parent_edge = [], {}
+        for root in roots:
+            if visited[root]:
+                continue
+            visited[root] = 1
+            stack = [root]
+            while stack:
+                v = stack.pop()
+                order.append(v)
+                for e, w in tree_edges.get(v, ()):
+                    if not visited[w]:
+                        visited[w] = 1
+                        parent_edge[w] = (e, v)
+                        stack.append(w)
+
+        marked = bytearray(num_nodes)
+        for v in defects:
+            marked[v] = 1
+        flips_logical = False
+        for v in reversed(order):
+            if marked[v] and v in parent_edge:
+                e, u = parent_edge[v]
+                flips_logical ^= self.edge_flips_logical[e]
+                marked[v] = 0
+                marked[u] ^= 1
+        return flips_logical
+
+
+class LookupTableDecoder:
+    """Syndrome lookup-table decoder for small codes.
+
+    Every syndrome is mapped to a minimum-weight recovery once, so decoding a
+    batch of shots is a single fancy-index lookup on packed syndrome integers.
+    The codes are CSS codes, so bit flips and phase flips are decoded
+    separately. Bit flips ('X') use the Z-type checks, and phase flips ('Z')
+    use the X-type checks. Each entry also holds the support of the logical
+    operator whose parity a residual error of that kind flips.
+    """
+
+    CODES = {
+        # Shor [[9,1,3]]: pairwise Z checks inside each block of three, X checks across pairs of blocks
+        "Shor Code": {
+            'X': ([[1, 1, 0, 0, 0, 0, 0, 0, 0],
+                   [0, 1, 1, 0, 0, 0, 0, 0, 0],
+                   [0, 0, 0, 1, 1, 0, 0, 0, 0],
+                   [0, 0, 0, 0, 1, 1, 0, 0, 0],
+                   [0, 0, 0, 0, 0, 0, 1, 1, 0],
+                   [0, 0, 0, 0, 0, 0, 0, 1, 1]],
+                  [1, 1, 1, 1, 1, 1, 1, 1, 1]),
+            'Z': ([[1, 1, 1, 1, 1, 1, 0, 0, 0],
+                   [0, 0, 0, 1, 1, 1, 1, 1, 1]],
+                  [1, 1, 1, 0, 0, 0, 0, 0, 0]),
+        },
+        # Steane [[7,1,3]]: Hamming(7,4) checks of both types
+        "Steane Code": {
+            'X': ([[0, 0, 0, 1, 1, 1, 1],
+                   [0, 1, 1, 0, 0, 1, 1],
+                   [1, 0, 1, 0, 1, 0, 1]],
+                  [1, 1, 1, 1, 1, 1, 1]),
+            'Z': ([[0, 0, 0, 1, 1, 1, 1],
+                   [0, 1, 1, 0, 0, 1, 1],
+                   [1, 0, 1, 0, 1, 0, 1]],
+                  [1, 1, 1, 1, 1, 1, 1]),
+        },
+    }
+
+    def __init__(self, checks, logical):
+        self.checks = np.array(checks, dtype=np.uint8)
+        self.logical = np.array(logical, dtype=np.uint8)
+        num_checks, num_qubits = self.checks.shape
+        self.weights = 1 << np.arange(num_checks)
+
+        # Enumerate errors lightest first; the first error seen for a syndrome is its recovery
+        errors = ((np.arange(2 ** num_qubits)[:, None] >> np.arange(num_qubits)) & 1).astype(np.uint8)
+        errors = errors[np.argsort(errors.sum(axis=1), kind='stable')]
+        syndromes = self.pack_syndromes(errors)
+        found, first = np.unique(syndromes, return_index=True)
+        self.recoveries = np.zeros((2 ** num_checks, num_qubits), dtype=bool)
+        self.recoveries[found] = errors[first].astype(bool)
+        self.logical_flips = (self.recoveries.astype(np.uint8) @ self.logical) % 2 == 1
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def for_code(cls, name, error='X'):
+        """Return the cached decoder for the bit ('X') or phase ('Z') flips of a named code."""
+        return cls(*cls.CODES[name][error])
+
+    def pack_syndromes(self, readout):
+        """Turn a (shots, num_qubits) bit array into one syndrome integer per shot."""
+        return ((np.asarray(readout, dtype=np.uint8) @ self.checks.T) % 2) @ self.weights
+
+    def decode_batch(self, readout):
+        """Return (recoveries, logical errors) for a (shots, num_qubits) batch of readout flips."""
+        readout = np.asarray(readout, dtype=bool)
+        syndromes = self.pack_syndromes(readout)
+        observed = (readout.astype(np.uint8) @ self.logical) % 2 == 1
+        return self.recoveries[syndromes], observed ^ self.logical_flips[syndromes]
+
+
+class BlockStreams:
+    """Random draws for consecutive blocks of shots, each block from its own stream.
+
+    The shots are split into blocks of block_shots, and each block's draws
+    come from the generator of its seed. A sampler that runs several blocks in
+    one pass therefore gives the same bits as running each block on its own.
+    Without block_shots, a single seed is one ordinary stream.
+    """
+
+    def __init__(self, seeds, block_shots=None):
+        self.generators = [np.random.default_rng(seed) for seed in seeds]
+        self.block_shots = block_shots
+
+    @classmethod
+    def of(cls, seed):
+        return seed if isinstance(seed, cls) else cls([seed])
+
+    def blocks(self, shots):
+        """Return (generator, first shot, end shot) of every block of a batch of shots."""
+        if self.block_shots is None:
+            return [(self.generators[0], 0, shots)]
+        return [(generator, start, min(start + self.block_shots, shots))
+                for generator, start in zip(self.generators, range(0, shots, self.block_shots))]
+
+    def bits(self, shots):
+        """Fair random bits, one per shot."""
+        draws = [generator.integers(0, 2, size=stop - start, dtype=np.int8) for generator, start, stop in self.blocks(shots)]
+        return np.concatenate(draws).astype(bool)
+
+    def packed_bits(self, rows, num_bytes):
+        """Fair random bits packed eight shots per byte, of shape (rows, num_bytes).
+
+        Blocks hold a multiple of 8 shots, so each block owns whole bytes.
+        """
+        draws = [generator.integers(0, 256, size=(rows, -(-stop // 8) - start // 8), dtype=np.uint8)
+                 for generator, start, stop in self.blocks(8 * num_bytes)]
+        return np.concatenate(draws, axis=1)
+
+
+class TableauSimulator(cirq.Sampler):
+    """Aaronson-Gottesman stabilizer tableau sampler for Clifford circuits.
+
+    The X/Z part of the tableau evolves identically for every shot, so it is
+    stored once; only the sign column differs between shots and is kept as a
+    (repetitions, 2n) bit matrix. Memory and time scale polynomially in the
+    number of qubits instead of the 2^n of a state vector.
+    """
+
+    SUPPORTED_GATES = {cirq.I, cirq.H, cirq.S, cirq.S**-1, cirq.X, cirq.Y, cirq.Z, cirq.CNOT, cirq.CZ, cirq.ResetChannel()}
+
+    def __init__(self, seed=None):
+        self.rng = BlockStreams.of(seed)
+
+    @classmethod
+    def supports(cls, circuit):
+        """Return True if every operation in the circuit can run on the tableau."""
+        for op in circuit.all_operations():
+            if isinstance(op.gate, cirq.MeasurementGate):
+                continue
+            if op.gate not in cls.SUPPORTED_GATES:
+                return False
+        return True
+
+    def run_sweep(self, program, params, repetitions=1):
+        return [
+            self._run(cirq.resolve_parameters(program, resolver), resolver, repetitions)
+            for resolver in cirq.to_resolvers(params)
+        ]
+
+    def _run(self, circuit, resolver, repetitions):
+        records = {}
+        for op, bits in self.simulate(circuit, repetitions):
+            invert_mask = op.gate.full_invert_mask()
+            if any(invert_mask):
+                bits = bits ^ np.array(invert_mask, dtype=bool)
+            records.setdefault(op.gate.key, []).append(bits.astype(np.int8))
+
+        return cirq.ResultDict(
+            params=resolver,
+            records={key: np.stack(instances, axis=1) for key, instances in records.items()},
+        )
+
+    def simulate(self, circuit, repetitions, qubits=None):
+        """Yield (measurement op, raw (repetitions, num_qubits) outcome bits) in circuit order."""
+        qubits = sorted(circuit.all_qubits()) if qubits is None else qubits
+        index = {qubit: i for i, qubit in enumerate(qubits)}
+        n = len(qubits)
+
+        # Rows 0..n-1 are destabilizers, rows n..2n-1 stabilizers of |0...0>
+        self.x = np.zeros((2 * n, n), dtype=bool)
+        self.z = np.zeros((2 * n, n), dtype=bool)
+        self.x[np.arange(n), np.arange(n)] = True
+        self.z[n + np.arange(n), np.arange(n)] = True
+        self.r = np.zeros(2 * n, dtype=bool)
+        self.r_shot = np.zeros((repetitions, 2 * n), dtype=bool)
+
+        for op in circuit.all_operations():
+            targets = [index[q] for q in op.qubits]
+            if isinstance(op.gate, cirq.MeasurementGate):
+                yield op, np.stack([self._measure(a) for a in targets], axis=1)
+            elif isinstance(op.gate, cirq.ResetChannel):
+                self._reset(targets[0])
+            else:
+                self._apply_gate(op.gate, targets)
+
+    def _apply_gate(self, gate, targets):
+        x, z = self.x, self.z
+        if gate == cirq.H:
+            a, = targets
+            self.r ^= x[:, a] & z[:, a]
+            x[:, a], z[:, a] = z[:, a].copy(), x[:, a].copy()
+        elif gate == cirq.S:
+            a, = targets
+            self.r ^= x[:, a] & z[:, a]
+            z[:, a] ^= x[:, a]
+        elif gate == cirq.S**-1:
+            for _ in range(3):
+                self._apply_gate(cirq.S, targets)
+        elif gate == cirq.X:
+            self.r ^= z[:, targets[0]]
+        elif gate == cirq.Z:
+            self.r ^= x[:, targets[0]]
+        elif gate == cirq.Y:
+            self.r ^= x[:, targets[0]] ^ z[:, targets[0]]
+        elif gate == cirq.CNOT:
+            a, b = targets
+            self.r ^= x[:, a] & z[:, b] & ~(x[:, b] ^ z[:, a])
+            x[:, b] ^= x[:, a]
+            z[:, a] ^= z[:, b]
+        elif gate == cirq.CZ:
+            self._apply_gate(cirq.H, targets[1:])
+            self._apply_gate(cirq.CNOT, targets)
+            self._apply_gate(cirq.H, targets[1:])
+        elif gate != cirq.I:
+            raise ValueError(f"TableauSimulator does not support the gate {gate!r}.")
+
+    def _reset(self, a):
+        # Measure, then apply X to the shots that came out as 1
+        outcome = self._measure(a)
+        self.r_shot ^= outcome[:, None] & self.z[:, a][None, :]
+
+    @staticmethod
+    def _phase_exponent(x1, z1, x2, z2):
+        """Sum of the Aaronson-Gottesman g function over the last axis, mod 4."""
+        x1, z1, x2, z2 = (v.astype(np.int8) for v in (x1, z1, x2, z2))
+        g = (x1 & z1) * (z2 - x2) + (x1 & (1 - z1)) * (z2 * (2 * x2 - 1)) + ((1 - x1) & z1) * (x2 * (1 - 2 * z2))
+        return g.sum(axis=-1) % 4
+
+    def _measure(self, a):
+        x, z = self.x, self.z
+        n = x.shape[1]
+        anticommuting = np.flatnonzero(x[n:, a])
+
+        if anticommuting.size:
+            # Random outcome: pivot on the first stabilizer that anticommutes with Z_a
+            p = n + anticommuting[0]
+            rows = np.flatnonzero(x[:, a])
+            rows = rows[rows != p]
+            phase = self._phase_exponent(x[p], z[p], x[rows], z[rows]) == 2
+            self.r[rows] ^= self.r[p] ^ phase
+            self.r_shot[:, rows] ^= self.r_shot[:, [p]]
+            x[rows] ^= x[p]
+            z[rows] ^= z[p]
+
+            x[p - n], z[p - n] = x[p], z[p]
+            self.r[p - n] = self.r[p]
+            self.r_shot[:, p - n] = self.r_shot[:, p]
+            x[p], z[p] = False, False
+            z[p, a] = True
+            self.r[p] = False
+            self.r_shot[:, p] = self.rng.bits(self.r_shot.shape[0])
+            return self.r_shot[:, p].copy()
+
+        # Deterministic outcome: accumulate the stabilizers picked out by the destabilizers
+        scratch_x = np.zeros(n, dtype=bool)
+        scratch_z = np.zeros(n, dtype=bool)
+        scratch_r = False
+        scratch_shot = np.zeros(self.r_shot.shape[0], dtype=bool)
+        for i in np.flatnonzero(x[:n, a]):
+            row = n + i
+            exponent = (2 * scratch_r + 2 * self.r[row] + self._phase_exponent(x[row], z[row], scratch_x, scratch_z)) % 4
+            scratch_r = exponent == 2
+            scratch_shot ^= self.r_shot[:, row]
+            scratch_x ^= x[row]
+            scratch_z ^= z[row]
+        return scratch_shot ^ scratch_r
+
+
+class PauliFrameSimulator(cirq.Sampler):
+    """Batched Pauli-frame sampler for Clifford circuits with Pauli noise.
+
+    A single noiseless reference sample is taken with the TableauSimulator.
+    Every shot then carries its own Pauli frame, stored bit-packed along the
+    shot axis (one byte holds eight shots), which is pushed through the
+    Clifford gates with bitwise operations. Noise channels are sampled
+    independently per shot, so each shot sees its own error pattern.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = BlockStreams.of(seed)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def pauli_probabilities(gate):
+        """Return (p_x, p_y, p_z) for a single-qubit Pauli channel, or None."""
+        if gate is None or cirq.num_qubits(gate) != 1 or not cirq.has_mixture(gate) or cirq.has_unitary(gate):
+            return None
+        probabilities = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+        paulis = {'x': cirq.unitary(cirq.X), 'y': cirq.unitary(cirq.Y), 'z': cirq.unitary(cirq.Z)}
+        for probability, unitary in cirq.mixture(gate):
+            if cirq.allclose_up_to_global_phase(unitary, np.eye(2)):
+                continue
+            name = next((name for name, pauli in paulis.items() if cirq.allclose_up_to_global_phase(unitary, pauli)), None)
+            if name is None:
+                return None
+            probabilities[name] += probability
+        return probabilities['x'], probabilities['y'], probabilities['z']
+
+    @classmethod
+    def supports(cls, circuit):
+        """Return True if the circuit only holds tableau gates, measurements and Pauli channels."""
+        for op in circuit.all_operations():
+            if isinstance(op.gate, cirq.MeasurementGate) or op.gate in TableauSimulator.SUPPORTED_GATES:
+                continue
+            if cls.pauli_probabilities(op.gate) is None:
+                return False
+        return True
+
+    def run_sweep(self, program, params, repetitions=1):
+        results = []
+        for resolver in cirq.to_resolvers(params):
+            packed = self.sample_packed(cirq.resolve_parameters(program, resolver), repetitions)
+            records = {
+                key: np.unpackbits(bits, axis=-1, count=repetitions, bitorder='little').transpose(2, 0, 1).astype(np.int8)
+                for key, bits in packed.items()
+            }
+            results.append(cirq.ResultDict(params=resolver, records=records))
+        return results
+
+    def sample_packed(self, circuit, repetitions, flips_only=False):
+        """Sample the circuit and return bit-packed measurement arrays.
+
+        Each key maps to a uint8 array of shape (instances, num_qubits,
+        ceil(repetitions / 8)); shot k of a row is bit k % 8 (little-endian)
+        of byte k // 8. With flips_only the arrays hold only the flips caused
+        by noise relative to the noiseless circuit, which is what logical
+        error rates are computed from.
+        """
+        qubits = sorted(circuit.all_qubits())
+        index = {qubit: i for i, qubit in enumerate(qubits)}
+        num_bytes = (repetitions + 7) // 8
+
+        x = np.zeros((len(qubits), num_bytes), dtype=np.uint8)
+        if flips_only:
+            z = np.zeros((len(qubits), num_bytes), dtype=np.uint8)
+        else:
+            noiseless = cirq.Circuit(
+                cirq.Moment(op for op in moment.operations if self.pauli_probabilities(op.gate) is None) for moment in circuit
+            )
+            # Any noiseless outcome will do, since the random Z frames randomize the undetermined ones.
+            # A fixed one keeps the blocks of a BlockStreams seed independent of each other
+            reference = (bits[0] for _, bits in TableauSimulator(0).simulate(noiseless, 1, qubits))
+            # A random Z on |0> is harmless; it is what makes later measurements random
+            z = self.rng.packed_bits(len(qubits), num_bytes)
+
+        records = {}
+        self.advance(circuit, index, x, z, repetitions, records, None if flips_only else reference)
+        return {key: np.stack(instances) for key, instances in records.items()}
+
+    def sample_frames(self, circuit, repetitions):
+        """Return the packed noise frames (bit flips, phase flips) of every measurement.
+
+        Both are keyed like sample_packed(flips_only=True), which returns the
+        first of them. The phase flips are the Z part of each frame when the
+        qubit is measured. A Z-basis readout cannot see them, but a decoder
+        for phase errors needs them.
+        """
+        qubits = sorted(circuit.all_qubits())
+        index = {qubit: i for i, qubit in enumerate(qubits)}
+        x = np.zeros((len(qubits), (repetitions + 7) // 8), dtype=np.uint8)
+        z = np.zeros_like(x)
+        records, phase_records = {}, {}
+        self.advance(circuit, index, x, z, repetitions, records, phase_records=phase_records)
+        return ({key: np.stack(instances) for key, instances in records.items()},
+                {key: np.stack(instances) for key, instances in phase_records.items()})
+
+    def advance(self, moments, index, x, z, repetitions, records, reference=None, phase_records=None):
+        """Propagate the packed frames x and z through moments, appending measurement rows to records.
+
+        Without a reference (an iterator over the noiseless outcomes of the
+        measurements) the rows hold only the flips caused by noise, and
+        phase_records, if given, receives the Z part of the frames as well.
+        The frames are updated in place, so a caller can feed a long circuit
+        in pieces.
+        """
+        num_bytes = x.shape[1]
+        for moment in moments:
+            self._apply_noise(moment, index, x, z, repetitions)
+            for op in moment.operations:
+                if self.pauli_probabilities(op.gate) is not None:
+                    continue
+                targets = [index[q] for q in op.qubits]
+                if isinstance(op.gate, cirq.MeasurementGate):
+                    if reference is None:
+                        records.setdefault(op.gate.key, []).append(x[targets].copy())
+                        if phase_records is not None:
+                            phase_records.setdefault(op.gate.key, []).append(z[targets].copy())
+                        continue
+                    flips = np.where(next(reference) ^ np.array(op.gate.full_invert_mask(), dtype=bool), 0xFF, 0)
+                    records.setdefault(op.gate.key, []).append(x[targets] ^ flips.astype(np.uint8)[:, None])
+                    # The post-measurement state is a Z eigenstate, so re-randomize its Z component
+                    z[targets] = self.rng.packed_bits(len(targets), num_bytes)
+                elif isinstance(op.gate, cirq.ResetChannel):
+                    x[targets] = 0
+                    z[targets] = 0 if reference is None else self.rng.packed_bits(len(targets), num_bytes)
+                else:
+                    self._apply_gate(op.gate, targets, x, z)
+
+    def _apply_noise(self, moment, index, x, z, repetitions):
+        """Sample every Pauli channel in the moment as one (qubits, shots) matrix per channel."""
+        channels = {}
+        for op in moment.operations:
+            probabilities = self.pauli_probabilities(op.gate)
+            if probabilities is not None:
+                channels.setdefault(probabilities, []).append(index[op.qubits[0]])
+
+        for (p_x, p_y, p_z), rows in channels.items():
+            # One block at a time, so each block draws from its own stream into its own bytes
+            for generator, start, stop in self.rng.blocks(repetitions):
+                u = generator.random((len(rows), stop - start))
+                flip_x = (u < p_x) | ((u >= p_x + p_z) & (u < p_x + p_z + p_y))
+                flip_z = (u >= p_x) & (u < p_x + p_z + p_y)
+                x[rows, start // 8:-(-stop // 8)] ^= np.packbits(flip_x, axis=-1, bitorder='little')
+                z[rows, start // 8:-(-stop // 8)] ^= np.packbits(flip_z, axis=-1, bitorder='little')
+
+    @staticmethod
+    def _apply_gate(gate, targets, x, z):
+        if gate == cirq.H:
+            a, = targets
+            x[a], z[a] = z[a].copy(), x[a].copy()
+        elif gate in (cirq.S, cirq.S**-1):
+            a, = targets
+            z[a] ^= x[a]
+        elif gate == cirq.CNOT:
+            a, b = targets
+            x[b] ^= x[a]
+            z[a] ^= z[b]
+        elif gate == cirq.CZ:
+            a, b = targets
+            z[a] ^= x[b]
+            z[b] ^= x[a]
+        elif gate not in (cirq.I, cirq.X, cirq.Y, cirq.Z):
+            # Pauli gates only change signs, which the noiseless reference sample carries
+            raise ValueError(f"PauliFrameSimulator does not support the gate {gate!r}.")
+
+
+class OutcomeHistogram:
+    """Counts measurement outcomes on bit-packed rows.
+
+    Every shot is one row of bits, all measurement keys side by side, and is
+    packed into bytes. Each update counts one batch of rows with a single
+    np.unique. By default all distinct outcomes are kept. With top_k set, the
+    counts go into a count-min sketch instead, and only the top_k heaviest
+    outcomes are kept as candidates, so memory stays bounded however many
+    shots or distinct outcomes there are.
+    """
+
+    MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, widths=None, top_k=None, width=2 ** 16, depth=4, seed=0):
+        self.widths = None if widths is None else list(widths)
+        self.top_k = top_k
+        self.total = 0
+        self.keys = None
+        self.counts = np.zeros(0, dtype=np.int64)
+        if top_k is not None:
+            if width & (width - 1):
+                raise ValueError("Count-min sketch width must be a power of two.")
+            self.sketch = np.zeros((depth, width), dtype=np.int64)
+            self.salts = np.random.default_rng(seed).integers(1, 2 ** 63, size=(depth, 1), dtype=np.uint64)
+            self.shift = np.uint64(64 - width.bit_length() + 1)
+
+    @classmethod
+    def from_result(cls, result, top_k=None):
+        """Count the outcomes of a cirq result straight from its measurement records."""
+        records = [values[:, -1, :] for values in result.records.values()]
+        histogram = cls([bits.shape[1] for bits in records], top_k)
+        histogram.update(np.concatenate(records, axis=1))
+        return histogram
+
+    @classmethod
+    def from_frame(cls, data, top_k=None):
+        """Count the outcomes of a result.data style DataFrame of integer columns.
+
+        Keys wider than 63 bits are object columns of Python ints, as
+        SimulationLog.column returns them.
+        """
+        values = [data[name].to_numpy() for name in data.columns]
+        widths = [max(1, int(column.max()).bit_length()) if len(column) else 1 for column in values]
+        bits = np.concatenate([
+            cls.column_bits(column, width) for column, width in zip(values, widths)
+        ], axis=1) if widths else np.zeros((len(data), 0), dtype=np.int64)
+        histogram = cls(widths, top_k)
+        histogram.update(bits)
+        return histogram
+
+    @staticmethod
+    def column_bits(column, width):
+        """Unpack one integer column into (shots, width) big-endian bits."""
+        if width > 63:
+            return np.array([cirq.big_endian_int_to_bits(int(value), bit_count=width) for value in column],
+                            dtype=np.int64).reshape(len(column), width)
+        return (column.astype(np.int64)[:, None] >> np.arange(width - 1, -1, -1)) & 1
+
+    @staticmethod
+    def bits_column(bits):
+        """Pack (shots, width) big-endian bits into one integer per shot, like SimulationLog.column."""
+        if bits.shape[1] > 63:
+            return [cirq.big_endian_bits_to_int(row) for row in bits]
+        return bits.astype(np.int64) @ (1 << np.arange(bits.shape[1] - 1, -1, -1, dtype=np.int64))
+
+    def update(self, bits):
+        """Add a (shots, bits) batch of outcomes."""
+        bits = np.asarray(bits, dtype=np.uint8)
+        if self.widths is None:
+            self.widths = [1] * bits.shape[1]
+        packed = np.ascontiguousarray(np.packbits(bits, axis=1))
+        rows = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+        keys, counts = np.unique(rows, return_counts=True)
+        self.total += len(rows)
+
+        if self.top_k is None:
+            self.merge(keys, counts)
+            return
+
+        rows = np.broadcast_to(np.arange(len(self.sketch))[:, None], (len(self.sketch), len(keys)))
+        np.add.at(self.sketch, (rows, self.bucket(keys)), counts)
+        candidates = keys if self.keys is None else np.unique(np.concatenate([self.keys, keys]))
+        estimates = self.estimate(candidates)
+        keep = np.argsort(-estimates, kind='stable')[:self.top_k]
+        self.keys, self.counts = candidates[keep], estimates[keep]
+
+    def merge(self, keys, counts):
+        """Fold distinct keys and their counts into the exact table."""
+        if self.keys is None:
+            self.keys, self.counts = keys, counts.astype(np.int64)
+            return
+        merged, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]), minlength=len(merged)).astype(np.int64)
+        self.keys = merged
+
+    def estimate(self, keys):
+        """Count-mean-min estimate: subtract each bucket's expected share of the other outcomes."""
+        buckets = self.sketch[np.arange(len(self.sketch))[:, None], self.bucket(keys)]
+        noise = (self.total - buckets) / (self.sketch.shape[1] - 1)
+        unbiased = np.median(buckets - noise, axis=0)
+        return np.clip(np.minimum(buckets.min(axis=0), np.rint(unbiased)), 0, None).astype(np.int64)
+
+    def bucket(self, keys):
+        """Hash packed rows to one sketch column per sketch row."""
+        width = keys.dtype.itemsize
+        padded = np.zeros((len(keys), -(-width // 8) * 8), dtype=np.uint8)
+        padded[:, :width] = keys.view(np.uint8).reshape(len(keys), width)
+        words = padded.view(np.uint64)
+        digest = np.zeros(len(keys), dtype=np.uint64)
+        for column in words.T:
+            digest = (digest ^ column) * self.MULTIPLIER
+        return ((digest ^ self.salts) * self.MULTIPLIER) >> self.shift
+
+    def labels(self, keys):
+        """Format packed rows the way the histogram labels outcomes: one integer per key."""
+        bits = np.unpackbits(keys.view(np.uint8).reshape(len(keys), -1), axis=1, count=sum(self.widths))
+        columns, start = [], 0
+        for width in self.widths:
+            columns.append(self.bits_column(bits[:, start:start + width]))
+            start += width
+        return [''.join(str(value) for value in row) for row in zip(*columns)]
+
+    def most_common(self, n=None):
+        """Return up to n (label, count) pairs, largest count first."""
+        if self.keys is None:
+            return []
+        order = np.argsort(-self.counts, kind='stable')[:n]
+        return list(zip(self.labels(self.keys[order]), self.counts[order].tolist()))
+
+
 class SimulationManager:
-    def __init__(self, circuit, repetitions=1000):
+    """Runs a circuit and keeps the last result for plotting and saving.
+
+    Shots are drawn in blocks of block_shots, and block i is seeded by the
+    i-th child of the run seed's SeedSequence. A seeded result therefore
+    depends only on the seed, the block size and the repetitions. The number
+    of workers, the chunk size of run_in_chunks and the blocks served by the
+    result cache do not change it. Blocks are simulated in shards of
+    shard_blocks, the unit of work of the process pool when workers > 1.
+
+    Seeded runs on the frame and tableau samplers simulate the last block
+    whole and keep the first repetitions shots, so a smaller run is a prefix
+    of a larger one. Unseeded runs and the state vector simulator, where every
+    shot costs a full simulation, stop at the repetitions instead.
+    """
+
+    BACKENDS = ("auto", "tableau", "frame", "statevector")
+    BLOCK_SHOTS = 2 ** 12
+    SHARD_BLOCKS = 16
+
+    def __init__(self, circuit, repetitions=1000, backend="auto", seed=None, parameters=None, profiler=None, cache=None,
+                 workers=1, block_shots=BLOCK_SHOTS, shard_blocks=SHARD_BLOCKS):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown simulation backend '{backend}'.")
+        if block_shots < 8 or block_shots % 8:
+            raise ValueError("Block size must be a positive multiple of 8 shots.")
         self.circuit = circuit
         self.repetitions = repetitions
-        self.simulator = cirq.Simulator()
+        self.backend = backend
+        self.seed = seed
+        self.parameters = dict(parameters or {})
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.cache = cache
+        self.workers = workers
+        self.block_shots = block_shots
+        self.shard_blocks = shard_blocks
+        self.simulator = None
         self.result_data = None
+        self.analysis = None
+
+    def simulator_class(self):
+        """Pick the tableau backend for noiseless Clifford circuits, Pauli frames for noisy
+        Clifford circuits and the state vector otherwise."""
+        forced = {"tableau": TableauSimulator, "frame": PauliFrameSimulator}.get(self.backend)
+        if forced is not None and not forced.supports(self.circuit):
+            raise ValueError(f"The {self.backend} backend does not support every operation in this circuit.")
+        if self.backend == "tableau" or (self.backend == "auto" and TableauSimulator.supports(self.circuit)):
+            return TableauSimulator
+        if self.backend == "frame" or (self.backend == "auto" and PauliFrameSimulator.supports(self.circuit)):
+            return PauliFrameSimulator
+        return cirq.Simulator
+
+    def select_simulator(self, seed=None):
+        """Build the simulator simulator_class picks, seeded with seed or else the run seed."""
+        seed = self.seed if seed is None else seed
+        simulator_class = self.simulator_class()
+        if simulator_class is not cirq.Simulator:
+            return simulator_class(seed)
+        if isinstance(seed, np.random.SeedSequence):
+            seed = np.random.RandomState(seed.generate_state(8))
+        return cirq.Simulator(seed=seed)
+
+    @staticmethod
+    def block_seed(seed, index):
+        """Seed of one block: the index-th child of the run seed, or None for unseeded runs."""
+        if seed is None:
+            return None
+        return np.random.SeedSequence(seed, spawn_key=(index,))
+
+    @staticmethod
+    def run_shard(circuit, backend, seeds, block_shots, shots):
+        """Simulate shots over consecutive blocks, one per seed, returning their bits packed along the shot axis.
+
+        Every block but the last holds block_shots shots.
+        """
+        manager = SimulationManager(circuit, backend=backend, block_shots=block_shots)
+        if manager.simulator_class() is cirq.Simulator:
+            # The state vector simulator draws from a single stream, so its blocks run one at a time
+            blocks = [manager.select_simulator(seed).run(circuit, repetitions=min(block_shots, shots - start)).records
+                      for seed, start in zip(seeds, range(0, shots, block_shots))]
+            records = {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+        else:
+            sampler = manager.select_simulator(BlockStreams(seeds, block_shots))
+            records = sampler.run(circuit, repetitions=shots).records
+        return {key: np.packbits(values[:, -1, :].astype(bool), axis=0, bitorder='little')
+                for key, values in records.items()}
+
+    def block_count(self, repetitions):
+        return -(-repetitions // self.block_shots)
+
+    def chunk_blocks(self, chunk_size):
+        """Blocks per shard for chunks of at least chunk_size shots; the shard size without one."""
+        return self.shard_blocks if chunk_size is None else self.block_count(chunk_size)
+
+    def shard_shots(self, blocks):
+        """Shots to simulate for a shard of blocks: whole blocks, or up to the repetitions; see the class docstring."""
+        whole = len(blocks) * self.block_shots
+        if self.seed is not None and not isinstance(self.simulator, cirq.Simulator):
+            return whole
+        return min(whole, self.repetitions - blocks.start * self.block_shots)
+
+    def shard_plan(self, first, count, shard_blocks=None):
+        """Group the blocks first..count-1 into shards of shard_blocks, as ranges of block indices."""
+        shard_blocks = shard_blocks or self.shard_blocks
+        return [range(start, min(start + shard_blocks, count)) for start in range(first, count, shard_blocks)]
+
+    def simulate_shards(self, plan):
+        """Yield {key: (shots, num_qubits) bits} for every planned shard, in plan order."""
+        arguments = [(self.circuit, self.backend, [self.block_seed(self.seed, index) for index in blocks], self.block_shots,
+                      self.shard_shots(blocks)) for blocks in plan]
+        executor = None
+        if self.workers > 1 and len(plan) > 1:
+            executor = ProcessPoolExecutor(max_workers=min(self.workers, len(plan)))
+            packed_shards = executor.map(self.run_shard, *zip(*arguments))
+        else:
+            packed_shards = itertools.starmap(self.run_shard, arguments)
+        try:
+            for blocks, packed in zip(plan, packed_shards):
+                yield {key: np.unpackbits(bits, axis=0, count=self.shard_shots(blocks), bitorder='little').astype(bool)
+                       for key, bits in packed.items()}
+        finally:
+            # A caller that stops early (a cancelled run) should not wait for the remaining shards
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def merge_shards(shards, shots=None):
+        """Concatenate shard bits into a cirq result, keeping the first shots."""
+        return cirq.ResultDict(records={key: np.concatenate([shard[key] for shard in shards])[:shots, None, :].astype(np.int8)
+                                        for key in (shards[0] if shards else {})})
+
+    def simulate_chunks(self, shards, plan, chunked):
+        """Append the bits of every planned shard to shards.
+
+        If chunked, yields (completed shots, result so far) after each shard
+        but the last.
+        """
+        done = sum(len(next(iter(shard.values()))) for shard in shards)
+        simulated = self.simulate_shards(plan)
+        try:
+            for index, blocks in enumerate(plan):
+                shots = self.shard_shots(blocks)
+                with self.profiler.span("simulate", shots=min(shots, self.repetitions - done)):
+                    shards.append(next(simulated))
+                done += shots
+                if chunked and index < len(plan) - 1:
+                    with self.profiler.span("collect chunks"):
+                        result = self.merge_shards(shards, self.repetitions)
+                    yield done, result
+        finally:
+            simulated.close()
 
     def run_simulation(self):
         """Run the quantum circuit simulation."""
-        result = self.simulator.run(self.circuit, repetitions=self.repetitions)
+        for _, result in self.run_in_chunks():
+            pass
+        return result
+
+    def run_in_chunks(self, chunk_size=None):
+        """Run the simulation, yielding (completed shots, result so far) after every chunk.
+
+        A chunk is a shard of whole blocks that holds at least chunk_size
+        shots. The chunk size changes how often results arrive, not the
+        result. Without a chunk size only the final result is yielded.
+        """
+        # Unseeded runs should draw fresh shots, so they never go through the cache
+        if self.cache is not None and self.seed is not None:
+            yield from self.run_cached(chunk_size)
+            return
+        # The circuit may have grown since the last run, so re-select every time
+        self.simulator = self.select_simulator()
+        shards = []
+        plan = self.shard_plan(0, self.block_count(self.repetitions), self.chunk_blocks(chunk_size))
+        yield from self.simulate_chunks(shards, plan, chunk_size is not None)
+        result = self.merge_shards(shards, self.repetitions)
+        self.store_result(result)
+        yield self.repetitions, result
+
+    def run_cached(self, chunk_size=None):
+        """Serve whole blocks from the result cache and simulate only the rest, chunk by chunk.
+
+        An entry holds the first blocks of its run, so it serves any smaller
+        request from its whole blocks, and a larger request only simulates the
+        blocks after them and tops the entry up. The result is the one run_in_chunks would return
+        without a cache. Only seeded runs are cached; see run_in_chunks.
+        """
+        self.simulator = self.select_simulator()
+        with self.profiler.span("serialize circuit"):
+            circuit_json = cirq.to_json(self.circuit)
+        entry = self.cache.key(circuit_json, self.parameters, self.seed, type(self.simulator).__name__, self.block_shots)
+        with self.profiler.span("cache lookup"):
+            records = self.cache.load(entry)
+        stored = len(next(iter(records.values()))) if records else 0
+        # A short last block is simulated again, since a longer run would need it whole
+        cached = stored // self.block_shots
+        count = self.block_count(self.repetitions)
+        reused = min(cached, count)
+
+        shards = [{key: bits[:reused * self.block_shots] for key, bits in records.items()}] if reused else []
+        plan = self.shard_plan(reused, count, self.chunk_blocks(chunk_size))
+        yield from self.simulate_chunks(shards, plan, chunk_size is not None)
+        shots = sum(len(next(iter(shard.values()))) for shard in shards)
+        if shots > stored:
+            with self.profiler.span("cache store", shots=shots):
+                self.cache.store(entry, {key: np.concatenate([shard[key] for shard in shards]) for key in shards[0]},
+                                 circuit_json, self.parameters, self.seed)
+
+        result = self.merge_shards(shards, self.repetitions)
+        self.store_result(result, circuit_json)
+        yield self.repetitions, result
+
+    def store_result(self, result, circuit_json=None):
+        """Keep the raw measurement bits of the last run for saving; see LoggingManager."""
+        if circuit_json is None:
+            with self.profiler.span("serialize circuit"):
+                circuit_json = cirq.to_json(self.circuit)
         self.result_data = {
-            'circuit': cirq.to_json(self.circuit),
-            'measurements': result.data.to_dict(),
+            'circuit': circuit_json,
+            'parameters': dict(self.parameters, repetitions=result.repetitions,
+                               backend=type(self.simulator).__name__),
+            'seed': self.seed,
+            'records': {key: values[:, -1, :] for key, values in result.records.items()},
+            'profile': self.profiler.records(),
         }
-        return result
 
     def visualize_measurement_results(self, result):
         """Plot the measurement results."""
-        data = result.data
-        bitstring_series = data.apply(lambda row: ''.join(row.astype(str)), axis=1)
-        counts = bitstring_series.value_counts()
+        import matplotlib.pyplot as plt
+        with self.profiler.span("histogram figure", shots=result.repetitions):
+            fig, ax = plt.subplots(figsize=(12, 6))
+            self.draw_measurement_results(ax, result)
+        return fig
 
-        fig, ax = plt.subplots(figsize=(12, 6))
-        counts.plot.bar(ax=ax)
+    def draw_measurement_results(self, ax, data, max_bars=64, in_place=False):
+        """Draw the most common outcomes of a histogram, result or measurement DataFrame onto an axis.
+
+        With in_place, an axis that already shows the same set of outcomes
+        keeps its bars, tick labels and limits and only the bar heights and
+        title change; the return value tells whether that happened.
+        """
+        if isinstance(data, OutcomeHistogram):
+            histogram = data
+        elif isinstance(data, cirq.Result):
+            histogram = OutcomeHistogram.from_result(data)
+        else:
+            histogram = OutcomeHistogram.from_frame(data)
+        counts = histogram.most_common(max_bars)
+        shown = sum(count for _, count in counts)
+        if shown < histogram.total:
+            title = f'Measurement Results (top {len(counts)} outcomes, {shown} of {histogram.total} shots)'
+        else:
+            title = 'Measurement Results'
+
+        if in_place and ax.containers:
+            positions = {label.get_text(): index for index, label in enumerate(ax.get_xticklabels())}
+            top = ax.get_ylim()[1]
+            if set(positions) == {label for label, _ in counts} and all(count <= top for _, count in counts):
+                bars = ax.containers[0]
+                for label, count in counts:
+                    bars[positions[label]].set_height(count)
+                ax.set_title(title)
+                return True
+
+        ax.cla()
+        ax.bar(range(len(counts)), [count for _, count in counts])
+        ax.set_xticks(range(len(counts)))
+        ax.set_xticklabels([label for label, _ in counts], rotation=90)
         ax.set_xlabel('Measurement Outcome')
         ax.set_ylabel('Counts')
-        ax.set_title('Measurement Results')
-        return fig
-
-    def visualize_lattice(self, size, result, style="coolwarm"):
+        if in_place:
+            # Headroom so that growing counts can keep being updated in place
+            ax.set_ylim(0, 1.5 * max((count for _, count in counts), default=1))
+        ax.set_title(title)
+        return False
+
+    def count_outcomes(self, chunk_size=10 ** 5, top_k=None):
+        """Run the simulation in chunks and keep only the outcome histogram, not the shots.
+
+        The chunks are the shards of run_simulation, so the histogram counts
+        the shots it would return.
+        """
+        self.simulator = self.select_simulator()
+        histogram = None
+        done = 0
+        plan = self.shard_plan(0, self.block_count(self.repetitions), self.chunk_blocks(chunk_size))
+        simulated = self.simulate_shards(plan)
+        try:
+            for blocks in plan:
+                shots = min(self.shard_shots(blocks), self.repetitions - done)
+                with self.profiler.span("simulate", shots=shots):
+                    shard = next(simulated)
+                with self.profiler.span("count outcomes", shots=shots):
+                    records = [bits[:shots] for bits in shard.values()]
+                    if histogram is None:
+                        histogram = OutcomeHistogram([bits.shape[1] for bits in records], top_k)
+                    histogram.update(np.concatenate(records, axis=1))
+                done += shots
+        finally:
+            simulated.close()
+        return histogram
+
+    def visualize_lattice(self, size, result, style="coolwarm", stage='before'):
         """Visualize the surface code lattice with measurement results."""
-        data = result.data
-        measurement = data.iloc[0]  
-        lattice = np.zeros((size, size))
-
-        for i in range(size):
-            for j in range(size):
-                index = i * size + j
-                key = f'm{index}_step1'  
-                if key in measurement:
-                    lattice[i, j] = measurement[key]
+        import matplotlib.pyplot as plt
+        lattice = self.lattice_values(size, result, stage)
+        with self.profiler.span("lattice figure"):
+            fig, ax = plt.subplots()
+            self.draw_lattice(ax, lattice, style)
+        return fig
 
-        fig, ax = plt.subplots()
+    def lattice_analysis(self, size, result):
+        """Return the LatticeAnalysis of a result, reusing it while the result is unchanged."""
+        if self.analysis is None or self.analysis[0] is not result or self.analysis[1].size != size:
+            with self.profiler.span("lattice analysis", shots=result.repetitions):
+                self.analysis = (result, LatticeAnalysis.from_result(size, result))
+        return self.analysis[1]
+
+    def lattice_values(self, size, result, stage='before'):
+        """Return each qubit's flip rate over all shots, before or after correction, on the size x size lattice."""
+        return self.lattice_analysis(size, result).flip_rates(stage)
+
+    def draw_lattice(self, ax, lattice, style="coolwarm"):
+        """Draw a lattice onto an axis, updating its image in place if it already has one of the same shape."""
+        if ax.images and ax.images[0].get_array().shape == lattice.shape:
+            image = ax.images[0]
+            image.set_data(lattice)
+            image.set_cmap(style.lower())
+            image.autoscale()
+            return
+        ax.cla()
         cax = ax.matshow(lattice, cmap=style.lower()) 
-        fig.colorbar(cax)
+        if ax.figure.axes[1:]:
+            # Reuse the colorbar axis left by a previous lattice
+            ax.figure.colorbar(cax, cax=ax.figure.axes[1])
+        else:
+            ax.figure.colorbar(cax)
         ax.set_title('Surface Code Lattice Measurement')
-        return fig
 
     def show_qubit_states(self, result):
         """Display the qubit states and probabilities."""
-        qubit_probs = result.data.describe().transpose()['mean']  
+        import matplotlib.pyplot as plt
+        qubit_probs = outcome_probabilities(result)
         fig, ax = plt.subplots(figsize=(12, 6))
         qubit_probs.plot.bar(ax=ax)
         ax.set_xlabel('Qubits')
@@ -389,90 +1709,484 @@ class SimulationManager:
 
     def visualize_measurement_results_from_data(self, measurements):
         """Visualize measurement results from saved data."""
-        data = pd.DataFrame(measurements)
-        bitstring_series = data.apply(lambda row: ''.join(row.astype(str)), axis=1)
-        counts = bitstring_series.value_counts()
-
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots(figsize=(12, 6))
-        counts.plot.bar(ax=ax)
-        ax.set_xlabel('Measurement Outcome')
-        ax.set_ylabel('Counts')
-        ax.set_title('Measurement Results')
+        self.draw_measurement_results(ax, pd.DataFrame(measurements))
         return fig
 
     def visualize_lattice_from_data(self, size, lattice_data, style="coolwarm"):
         """Visualize lattice from saved data."""
-        lattice = np.array(lattice_data)
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
-        cax = ax.matshow(lattice, cmap=style.lower())
-        fig.colorbar(cax)
-        ax.set_title('Surface Code Lattice Measurement')
+        self.draw_lattice(ax, np.array(lattice_data), style)
         return fig
 
 
-class VisualizationManager:
-    def __init__(self, display_area):
-        self.display_area = display_area
-        self.ensure_layout()
-        self.pop_out_windows = []
-
-    def ensure_layout(self):
-        """Ensure the display area has a layout."""
-        if self.display_area.layout() is None:
-            self.display_area.setLayout(QVBoxLayout())
-
-    def display_figure(self, fig, title="Figure"):
-        """Display a matplotlib figure in the PyQt5 window."""
-        self.ensure_layout()  
-        canvas = FigureCanvas(fig)
-        canvas.draw()
-
-
-        container_widget = QWidget()
-        container_layout = QVBoxLayout()
-        container_widget.setLayout(container_layout)
-        container_layout.addWidget(canvas)
-
-        pop_out_button = QPushButton("Pop Out")
-        container_layout.addWidget(pop_out_button)
-        pop_out_button.clicked.connect(lambda: self.pop_out_figure(fig, title))
-
-
-        self.display_area.layout().addWidget(container_widget)
-        plt.close(fig)
+class CircuitDiagram:
+    """Vector rendering of a circuit, one column per moment and one row per qubit.
+
+    The layout (cell positions, labels, control dots, connectors) is computed
+    once per circuit into NumPy arrays and cached by circuit content. draw()
+    renders any window of moments and qubits with a few scatter and line
+    collections, so paging, zooming and pop-outs never re-layout the circuit.
+    Gate labels are only drawn when the window holds few enough cells and each
+    cell is large enough to read them; otherwise cells are coloured by kind.
+    """
+
+    LABELS = {cirq.H: 'H', cirq.X: 'X', cirq.Y: 'Y', cirq.Z: 'Z', cirq.S: 'S', cirq.S ** -1: 'S†', cirq.I: 'I'}
+    KIND_COLORS = {'gate': '#AED6F1', 'noise': '#F5B7B1', 'measure': '#ABEBC6', 'reset': '#F9E79F'}
+    CACHE_SIZE = 16
+    cache = OrderedDict()
+
+    def __init__(self, circuit):
+        self.qubits = sorted(circuit.all_qubits())
+        self.num_moments = len(circuit)
+        row_of = {qubit: row for row, qubit in enumerate(self.qubits)}
+
+        cells, connectors, controls, targets = [], [], [], []
+        for column, moment in enumerate(circuit):
+            for operation in moment.operations:
+                rows = [row_of[qubit] for qubit in operation.qubits]
+                if len(rows) > 1:
+                    connectors.append((column, min(rows), max(rows)))
+                gate = operation.gate
+                if gate == cirq.CNOT:
+                    controls.append((column, rows[0]))
+                    targets.append((column, rows[1]))
+                    continue
+                if gate == cirq.CZ:
+                    controls.extend((column, row) for row in rows)
+                    continue
+                kind, label = self.describe(operation)
+                cells.extend((column, row, kind, label) for row in rows)
+
+        self.cell_columns = np.array([cell[0] for cell in cells], dtype=np.int64)
+        self.cell_rows = np.array([cell[1] for cell in cells], dtype=np.int64)
+        self.cell_kinds = np.array([cell[2] for cell in cells], dtype=object)
+        self.cell_labels = np.array([cell[3] for cell in cells], dtype=object)
+        self.connectors = np.array(connectors, dtype=np.int64).reshape(-1, 3)
+        self.controls = np.array(controls, dtype=np.int64).reshape(-1, 2)
+        self.targets = np.array(targets, dtype=np.int64).reshape(-1, 2)
+
+    @classmethod
+    def for_circuit(cls, circuit):
+        """Return the cached layout of a circuit, building it on first use."""
+        key = cirq.FrozenCircuit(circuit)
+        if key in cls.cache:
+            cls.cache.move_to_end(key)
+            return cls.cache[key]
+        diagram = cls(circuit)
+        cls.cache[key] = diagram
+        if len(cls.cache) > cls.CACHE_SIZE:
+            cls.cache.popitem(last=False)
+        return diagram
+
+    @classmethod
+    def describe(cls, operation):
+        """Return the (kind, label) of a boxed operation."""
+        gate = operation.gate
+        if cirq.is_measurement(operation):
+            return 'measure', 'M'
+        if isinstance(gate, cirq.ResetChannel):
+            return 'reset', 'R'
+        if gate in cls.LABELS:
+            return 'gate', cls.LABELS[gate]
+        if isinstance(gate, cirq.BitFlipChannel):
+            return 'noise', 'BF'
+        if isinstance(gate, cirq.PhaseFlipChannel):
+            return 'noise', 'PF'
+        if isinstance(gate, (cirq.AsymmetricDepolarizingChannel, cirq.DepolarizingChannel)):
+            return 'noise', 'D'
+        kind = 'gate' if cirq.has_unitary(operation) else 'noise'
+        return kind, str(gate if gate is not None else operation)[:4]
+
+    def draw(self, ax, moments=None, qubits=None, label_limit=600):
+        """Draw moments [start, stop) on qubit rows [start, stop) onto an axis."""
+        from matplotlib.collections import LineCollection
+        from matplotlib.patches import Patch
+
+        m0, m1 = moments if moments is not None else (0, self.num_moments)
+        q0, q1 = qubits if qubits is not None else (0, len(self.qubits))
+        m1, q1 = max(m1, m0 + 1), max(q1, q0 + 1)
+
+        # Marker sizes follow the on-screen size of one cell
+        extent = ax.get_window_extent()
+        cell_points = min(extent.width / (m1 - m0), extent.height / (q1 - q0)) * 72 / ax.figure.dpi
+        box = (0.7 * cell_points) ** 2
+        dot = (0.25 * cell_points) ** 2
+
+        rows = np.arange(q0, min(q1, len(self.qubits)))
+        ax.add_collection(LineCollection([((m0 - 0.5, row), (m1 - 0.5, row)) for row in rows],
+                                         colors='#7F8C8D', linewidths=0.6, zorder=1))
+
+        if len(self.connectors):
+            column, low, high = self.connectors.T
+            visible = (column >= m0) & (column < m1) & (high >= q0) & (low < q1)
+            segments = [((c, max(l, q0 - 0.5)), (c, min(h, q1 - 0.5)))
+                        for c, l, h in self.connectors[visible]]
+            ax.add_collection(LineCollection(segments, colors='black', linewidths=0.8, zorder=2))
+
+        def window(points):
+            return points[(points[:, 0] >= m0) & (points[:, 0] < m1) & (points[:, 1] >= q0) & (points[:, 1] < q1)]
+
+        controls, targets = window(self.controls), window(self.targets)
+        ax.scatter(controls[:, 0], controls[:, 1], s=dot, c='black', zorder=3)
+        ax.scatter(targets[:, 0], targets[:, 1], s=box, facecolors='white', edgecolors='black', linewidths=0.8, zorder=3)
+        ax.scatter(targets[:, 0], targets[:, 1], s=box, marker='+', c='black', linewidths=0.8, zorder=4)
+
+        visible = (self.cell_columns >= m0) & (self.cell_columns < m1) & (self.cell_rows >= q0) & (self.cell_rows < q1)
+        kinds = self.cell_kinds[visible]
+        colors = [self.KIND_COLORS[kind] for kind in kinds]
+        ax.scatter(self.cell_columns[visible], self.cell_rows[visible], s=box, marker='s', c=colors,
+                   edgecolors='black', linewidths=0.5, zorder=3)
+        if visible.sum() <= label_limit and cell_points >= 8:
+            fontsize = min(10.0, 0.4 * cell_points)
+            for column, row, label in zip(self.cell_columns[visible], self.cell_rows[visible], self.cell_labels[visible]):
+                ax.text(column, row, label, ha='center', va='center', fontsize=fontsize, zorder=5)
+        else:
+            ax.legend(handles=[Patch(facecolor=color, edgecolor='black', label=kind)
+                               for kind, color in self.KIND_COLORS.items() if kind in set(kinds)],
+                      loc='upper left', bbox_to_anchor=(1.0, 1.0), fontsize=8)
+
+        ax.set_xlim(m0 - 0.5, m1 - 0.5)
+        ax.set_ylim(q1 - 0.5, q0 - 0.5)
+        step = max(1, len(rows) // 40)
+        ax.set_yticks(rows[::step])
+        ax.set_yticklabels([str(self.qubits[row]) for row in rows[::step]], fontsize=7)
+        ax.set_xlabel('Moment')
+        ax.set_title(f'Circuit Diagram (moments {m0}-{min(m1, self.num_moments) - 1} of {self.num_moments}, '
+                     f'qubits {q0}-{rows[-1] if len(rows) else q0} of {len(self.qubits)})')
+
+
+SweepPoint = namedtuple('SweepPoint', ['size', 'error_rate', 'error_type', 'algorithm'])
+
+
+class SweepManager:
+    """Logical-error-rate sweeps over (size, error rate, error type, algorithm) grids.
+
+    Every point runs in its own worker process and samples shots in batches
+    until the Wilson confidence interval on its logical error rate is tight
+    enough, or until max_shots is reached. Rows are yielded as soon as their
+    point finishes, so results can be streamed to a table or CSV file.
+    """
+
+    COLUMNS = ['size', 'error_rate', 'error_type', 'algorithm', 'shots', 'errors',
+               'logical_error_rate', 'ci_low', 'ci_high', 'seconds']
+
+    def __init__(self, points, max_shots=10**6, batch_shots=10**4, confidence=0.95,
+                 relative_precision=0.1, absolute_precision=1e-4, workers=None, seed=None):
+        self.points = [SweepPoint(*point) for point in points]
+        self.max_shots = max_shots
+        self.batch_shots = batch_shots
+        self.confidence = confidence
+        self.relative_precision = relative_precision
+        self.absolute_precision = absolute_precision
+        self.workers = workers
+        self.seed = seed
+        self.results = []
+
+    @classmethod
+    def from_grid(cls, sizes, error_rates, error_types=("Depolarizing",), algorithms=("None",), **kwargs):
+        """Build a sweep over the cartesian product of the given parameter lists."""
+        return cls(itertools.product(sizes, error_rates, error_types, algorithms), **kwargs)
 
-    def pop_out_figure(self, fig, title="Figure"):
-        """Create a new window to display the figure."""
-        pop_out_window = FigureWindow(fig, title)
-        pop_out_window.show()
-        self.pop_out_windows.append(pop_out_window)
+    @staticmethod
+    def wilson_interval(errors, shots, confidence=0.95):
+        """Wilson score interval for a binomial proportion."""
+        if shots == 0:
+            return 0.0, 1.0
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        rate = errors / shots
+        denominator = 1 + z * z / shots
+        center = (rate + z * z / (2 * shots)) / denominator
+        half_width = z * np.sqrt(rate * (1 - rate) / shots + z * z / (4 * shots * shots)) / denominator
+        return max(0.0, center - half_width), min(1.0, center + half_width)
 
+    @staticmethod
+    def run_point(point, max_shots, batch_shots, confidence, relative_precision, absolute_precision, seed):
+        """Sample one sweep point until its confidence interval is tight enough."""
+        start = time.perf_counter()
+        circuit_manager = CircuitManager(point.size, point.error_rate, point.error_type, point.algorithm)
+        circuit_manager.build_circuit()
+        sampler = PauliFrameSimulator(seed)
+
+        shots = errors = 0
+        ci_low, ci_high = 0.0, 1.0
+        while shots < max_shots:
+            batch = min(batch_shots, max_shots - shots)
+            errors += int(circuit_manager.sample_logical_errors(sampler, batch).sum())
+            shots += batch
+            ci_low, ci_high = SweepManager.wilson_interval(errors, shots, confidence)
+            if (ci_high - ci_low) / 2 <= max(relative_precision * errors / shots, absolute_precision):
+                break
+
+        row = dict(point._asdict())
+        row.update(shots=shots, errors=errors, logical_error_rate=errors / shots, ci_low=ci_low,
+                   ci_high=ci_high, seconds=time.perf_counter() - start)
+        return row
+
+    def run(self):
+        """Run every point over a process pool, yielding result rows as they complete."""
+        seeds = np.random.SeedSequence(self.seed).spawn(len(self.points))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self.run_point, point, self.max_shots, self.batch_shots, self.confidence,
+                                self.relative_precision, self.absolute_precision, point_seed)
+                for point, point_seed in zip(self.points, seeds)
+            ]
+            for future in as_completed(futures):
+                row = future.result()
+                self.results.append(row)
+                yield row
+
+    def run_to_csv(self, filepath):
+        """Run the sweep, appending each finished point to a CSV file."""
+        with open(filepath, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.COLUMNS)
+            writer.writeheader()
+            for row in self.run():
+                writer.writerow(row)
+                file.flush()
+        return self.results_frame()
+
+    def results_frame(self):
+        """Return the finished points as a DataFrame sorted by sweep parameters."""
+        frame = pd.DataFrame(self.results, columns=self.COLUMNS)
+        return frame.sort_values(['algorithm', 'error_type', 'size', 'error_rate']).reset_index(drop=True)
+
+
+class SimulationLog:
+    """Lazily decoded view of a binary result file.
+
+    The file starts with MAGIC, a little-endian uint64 header length and a
+    JSON header (circuit, parameters, seed, stage profile, shot count and
+    column table). Each measurement key is then stored as a
+    (num_qubits, ceil(shots / 8)) block of bits packed along the shot axis.
+    The blocks are memory-mapped, and only the keys a caller asks for are
+    unpacked.
+    """
+
+    MAGIC = b'QECRES01'
+    ALIGNMENT = 64
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as file:
+            if file.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError(f"'{filepath}' is not a binary simulation result file.")
+            header_length = int.from_bytes(file.read(8), 'little')
+            self.header = json.loads(file.read(header_length).decode('utf-8'))
+        self.shots = self.header['shots']
+        self.columns = {column['key']: column for column in self.header['columns']}
+        size = sum(column['qubits'] for column in self.columns.values()) * ((self.shots + 7) // 8)
+        self.data = np.memmap(filepath, dtype=np.uint8, mode='r', offset=self.header['data_offset'], shape=(size,)) if size else np.zeros(0, dtype=np.uint8)
+
+    @classmethod
+    def write(cls, results, filepath):
+        """Write SimulationManager.result_data to a binary result file."""
+        records = {key: np.asarray(bits, dtype=bool) for key, bits in results['records'].items()}
+        shots = next(iter(records.values())).shape[0] if records else 0
+        num_bytes = (shots + 7) // 8
+
+        columns, offset = [], 0
+        for key, bits in records.items():
+            columns.append({'key': key, 'qubits': bits.shape[1], 'offset': offset})
+            offset += bits.shape[1] * num_bytes
+        header = {
+            'version': 1,
+            'circuit': results['circuit'],
+            'parameters': results.get('parameters', {}),
+            'seed': results.get('seed'),
+            'profile': results.get('profile', []),
+            'shots': shots,
+            'columns': columns,
+        }
 
-class FigureWindow(QWidget):
-    def __init__(self, fig, title="Figure"):
-        super().__init__()
-        self.setWindowTitle(title)
-        self.layout = QVBoxLayout()
-        self.setLayout(self.layout)
-        canvas = FigureCanvas(fig)
-        canvas.draw()
-        self.layout.addWidget(canvas)
+        # The data offset depends on the header length, which depends on the offset
+        prefix = len(cls.MAGIC) + 8
+        data_offset = 0
+        while True:
+            header['data_offset'] = data_offset
+            encoded = json.dumps(header).encode('utf-8')
+            aligned = -(-(prefix + len(encoded)) // cls.ALIGNMENT) * cls.ALIGNMENT
+            if aligned == data_offset:
+                break
+            data_offset = aligned
+
+        with open(filepath, 'wb') as file:
+            file.write(cls.MAGIC)
+            file.write(len(encoded).to_bytes(8, 'little'))
+            file.write(encoded)
+            file.write(b'\0' * (data_offset - prefix - len(encoded)))
+            for bits in records.values():
+                file.write(np.packbits(bits.T, axis=1, bitorder='little').tobytes())
+
+    def __getitem__(self, name):
+        # Dictionary-style access mirrors the JSON export
+        if name == 'measurements':
+            return self.frame().to_dict()
+        return self.header[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def packed_bits(self, key):
+        """Return the (num_qubits, ceil(shots / 8)) packed block of one measurement key."""
+        column = self.columns[key]
+        num_bytes = (self.shots + 7) // 8
+        block = self.data[column['offset']:column['offset'] + column['qubits'] * num_bytes]
+        return np.asarray(block).reshape(column['qubits'], num_bytes)
+
+    def bits(self, key):
+        """Return the (shots, num_qubits) outcome bits of one measurement key."""
+        return np.unpackbits(self.packed_bits(key), axis=1, count=self.shots, bitorder='little').T
+
+    def column(self, key):
+        """Return one measurement key as integers, the way cirq's result.data packs it."""
+        bits = self.bits(key)
+        if bits.shape[1] > 63:
+            return np.array([cirq.big_endian_bits_to_int(row) for row in bits], dtype=object)
+        return bits.astype(np.int64) @ (1 << np.arange(bits.shape[1] - 1, -1, -1, dtype=np.int64))
+
+    def result(self, keys=None):
+        """Rebuild a cirq result holding only the requested keys."""
+        keys = list(self.columns) if keys is None else keys
+        return cirq.ResultDict(records={key: self.bits(key)[:, None, :].astype(np.int8) for key in keys})
+
+    def frame(self, keys=None):
+        """Return the requested keys as a result.data style DataFrame."""
+        keys = list(self.columns) if keys is None else keys
+        return pd.DataFrame({key: self.column(key) for key in keys})
 
 
 class LoggingManager:
     @staticmethod
     def log_simulation_results(results, filepath):
+        """Save results as a bit-packed binary file, or as JSON when the path ends in .json."""
+        if not filepath.lower().endswith('.json'):
+            SimulationLog.write(results, filepath)
+            return
+        measurements = pd.DataFrame({
+            key: cirq.ResultDict(records={key: np.asarray(bits)[:, None, :]}).data[key]
+            for key, bits in results['records'].items()
+        })
+        export = {
+            'circuit': results['circuit'],
+            'parameters': results.get('parameters', {}),
+            'seed': results.get('seed'),
+            'profile': results.get('profile', []),
+            'measurements': measurements.to_dict(),
+        }
         with open(filepath, 'w') as file:
-            json.dump(results, file)
+            json.dump(export, file)
 
     @staticmethod
     def load_simulation_log(filepath):
+        """Load a JSON export as a dict, or memory-map a binary file as a SimulationLog."""
+        with open(filepath, 'rb') as file:
+            is_binary = file.read(len(SimulationLog.MAGIC)) == SimulationLog.MAGIC
+        if is_binary:
+            return SimulationLog(filepath)
         with open(filepath, 'r') as file:
             return json.load(file)
 
 
+
+class ResultCache:
+    """Content-addressed on-disk cache of simulation results.
+
+    Entries are keyed by a hash of the circuit JSON (which holds the noise
+    channels), the run parameters, the seed, the simulator and the block size,
+    and are stored as binary result files. An entry holds the blocks of its
+    run, so SimulationManager.run_cached serves smaller requests from its
+    first whole blocks, and a request for more shots only simulates the
+    missing blocks and tops the entry up. When the directory grows past max_bytes, the least
+    recently used entries are deleted.
+    """
+
+    DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'qec-simulator')
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=2 ** 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, circuit_json, parameters, seed, simulator, block_shots):
+        content = json.dumps({
+            'circuit': circuit_json,
+            'parameters': {name: value for name, value in parameters.items() if name != 'repetitions'},
+            'seed': seed,
+            'simulator': simulator,
+            'block_shots': block_shots,
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.qecr')
+
+    def load(self, key):
+        """Return the cached bits of an entry as {key: (shots, num_qubits)}, or {} on a miss."""
+        path = self.path(key)
+        try:
+            log = SimulationLog(path)
+            records = {column: log.bits(column).astype(bool) for column in log.columns}
+        except (OSError, ValueError):
+            return {}
+        # The modification time is the entry's last use
+        os.utime(path)
+        return records
+
+    def store(self, key, records, circuit_json, parameters, seed):
+        """Write an entry, replacing it atomically, then evict down to max_bytes."""
+        path = self.path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        SimulationLog.write({'circuit': circuit_json, 'parameters': parameters, 'seed': seed,
+                             'records': records}, temporary)
+        os.replace(temporary, path)
+        self.evict()
+
+    def entries(self):
+        """Return (last use, size, path) of every entry, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.qecr'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+
+# The GUI lives in qec_gui.py so that importing the core needs neither PyQt5 nor a display
+GUI_CLASSES = ('QuantumErrorCorrectionSoftware', 'SimulationWorker', 'VisualizationManager', 'FigureWindow')
+
+
+def __getattr__(name):
+    if name in GUI_CLASSES:
+        import qec_gui
+        return getattr(qec_gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = QuantumErrorCorrectionSoftware()
-    window.show()
-    sys.exit(app.exec_())
+    import qec_gui
+    sys.exit(qec_gui.main())
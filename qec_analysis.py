@@ -0,0 +1,139 @@
+"""All-shot statistics of the lattice readout.
+
+LatticeAnalysis lays the per-qubit measurement keys (m{i}_step1 before
+correction, m{i}_step2 after) out once as a size x size lattice of bit rows,
+packed 8 shots per byte like binary result files. Rates and correlations are
+popcounts and bitwise operations over those rows, so 10^6 shots take
+milliseconds rather than a DataFrame row lookup per qubit.
+"""
+import numpy as np
+import pandas as pd
+
+STAGES = {'before': 'step1', 'after': 'step2'}
+
+# Number of set bits of every byte value, for NumPy versions without bitwise_count
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def count_ones(packed):
+    """Count the set bits along the last (packed shot) axis."""
+    if not hasattr(np, 'bitwise_count'):
+        return POPCOUNT[packed].sum(axis=-1, dtype=np.int64)
+    packed = np.ascontiguousarray(packed)
+    if packed.shape[-1] % 8 == 0:
+        # Rows are padded to whole words, so they can be counted 64 bits at a time
+        packed = packed.view(np.uint64)
+    return np.bitwise_count(packed).sum(axis=-1, dtype=np.int64)
+
+
+class LatticeAnalysis:
+    """Flip rates, correction deltas and correlation maps over every shot.
+
+    A flip is a qubit read out as 1. packed[stage] has shape
+    (size, size, 8 * ceil(shots / 64)); bit k % 8 of byte k // 8 is shot k,
+    and the padding bits are zero. Stages whose keys are missing from the result
+    read as all zeros, like qubits outside the measured lattice.
+    """
+
+    CHUNK_BYTES = 2 ** 13
+
+    def __init__(self, size, shots, packed):
+        self.size = size
+        self.shots = shots
+        self.packed = packed
+
+    @classmethod
+    def from_packed_columns(cls, size, shots, columns):
+        """Build from a mapping of measurement key to its packed row of shots."""
+        packed = {}
+        for stage, suffix in STAGES.items():
+            lattice = np.zeros((size * size, 8 * -(-shots // 64)), dtype=np.uint8)
+            for index in range(size * size):
+                key = f'm{index}_{suffix}'
+                if key in columns:
+                    lattice[index, :len(columns[key])] = columns[key]
+            packed[stage] = lattice.reshape(size, size, -1)
+        return cls(size, shots, packed)
+
+    @classmethod
+    def from_result(cls, size, result):
+        """Build from a cirq result, reading its records rather than result.data."""
+        keys = [f'm{index}_{suffix}' for suffix in STAGES.values() for index in range(size * size)]
+        columns = {key: np.packbits(result.records[key][:, -1, -1] != 0, bitorder='little')
+                   for key in keys if key in result.records}
+        return cls.from_packed_columns(size, result.repetitions, columns)
+
+    @classmethod
+    def from_log(cls, size, log):
+        """Build from a SimulationLog straight from its packed blocks, without unpacking."""
+        keys = [f'm{index}_{suffix}' for suffix in STAGES.values() for index in range(size * size)]
+        return cls.from_packed_columns(size, log.shots, {key: log.packed_bits(key)[-1] for key in keys if key in log.columns})
+
+    @classmethod
+    def from_frame(cls, size, data):
+        """Build from a result.data style DataFrame, such as the measurements of a JSON export."""
+        keys = [f'm{index}_{suffix}' for suffix in STAGES.values() for index in range(size * size)]
+        columns = {key: np.packbits(data[key].to_numpy() != 0, bitorder='little') for key in keys if key in data}
+        return cls.from_packed_columns(size, len(data), columns)
+
+    def bits(self, stage='before'):
+        """Unpack one stage into a (shots, size, size) bool array."""
+        return np.unpackbits(self.packed[stage], axis=-1, count=self.shots, bitorder='little').transpose(2, 0, 1).astype(bool)
+
+    def flip_rates(self, stage='before'):
+        """Fraction of shots in which each qubit read 1, as a (size, size) map."""
+        return count_ones(self.packed[stage]) / self.shots
+
+    def correction_delta(self):
+        """Change of each qubit's flip rate from before to after correction."""
+        return self.flip_rates('after') - self.flip_rates('before')
+
+    def changed_rates(self):
+        """Fraction of shots in which each qubit's readout differs before and after correction."""
+        return count_ones(self.packed['before'] ^ self.packed['after']) / self.shots
+
+    @staticmethod
+    def correlation(joint, rate_a, rate_b):
+        """Pearson correlation of two bits from P(a and b) and the marginal rates."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = (joint - rate_a * rate_b) / np.sqrt(rate_a * (1 - rate_a) * rate_b * (1 - rate_b))
+        # Qubits that never or always flip have no defined correlation
+        return np.nan_to_num(correlation)
+
+    def correlations(self, stage='before'):
+        """Pearson correlation between every pair of qubits, a (size**2, size**2) matrix.
+
+        The co-occurrence counts are a matrix product over the shots, unpacked
+        CHUNK_BYTES bytes (8 shots each) at a time to bound the float copy.
+        """
+        rows = self.packed[stage].reshape(self.size * self.size, -1)
+        joint = np.zeros((len(rows), len(rows)))
+        for start in range(0, rows.shape[1], self.CHUNK_BYTES):
+            chunk = np.unpackbits(rows[:, start:start + self.CHUNK_BYTES], axis=1).astype(np.float32)
+            joint += chunk @ chunk.T
+        rates = count_ones(rows) / self.shots
+        return self.correlation(joint / self.shots, rates[:, None], rates[None, :])
+
+    def neighbour_correlations(self, stage='before'):
+        """Correlation of each qubit with its right and lower neighbour.
+
+        Returns (horizontal, vertical) maps of shape (size, size - 1) and
+        (size - 1, size).
+        """
+        packed = self.packed[stage]
+        rates = count_ones(packed) / self.shots
+        horizontal = self.correlation(count_ones(packed[:, :-1] & packed[:, 1:]) / self.shots, rates[:, :-1], rates[:, 1:])
+        vertical = self.correlation(count_ones(packed[:-1] & packed[1:]) / self.shots, rates[:-1], rates[1:])
+        return horizontal, vertical
+
+
+def outcome_probabilities(result):
+    """Probability of reading 1 for every measured qubit, one entry per key and qubit."""
+    probabilities = {}
+    for key, values in result.records.items():
+        rates = np.count_nonzero(values[:, -1, :], axis=0) / result.repetitions
+        if len(rates) == 1:
+            probabilities[key] = rates[0]
+        else:
+            probabilities.update({f'{key}[{index}]': rate for index, rate in enumerate(rates)})
+    return pd.Series(probabilities)
@@ -0,0 +1,161 @@
+"""Benchmark suite for the simulation pipeline.
+
+Times circuit construction, simulation, the histogram and lattice plots, and
+saving and loading results. It sweeps lattice sizes, repetition counts, error
+types and codes. Each case runs in a fresh forked process (where the platform
+allows it), so peak RSS is reported per case rather than for the whole suite.
+Results are written as JSON, and can be saved as a baseline and compared on
+later runs:
+
+    python qec_bench.py --save-baseline bench_baseline.json
+    python qec_bench.py --baseline bench_baseline.json --output bench.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+SIZES = (3, 5, 7, 11)
+REPETITIONS = (1000, 100000)
+ERROR_TYPES = ("Bit-flip", "Phase-flip", "Depolarizing")
+ALGORITHMS = ("None", "Shor Code", "Steane Code")
+STAGES = ("build", "simulate", "histogram", "lattice", "save", "load")
+CASE_FIELDS = ('size', 'repetitions', 'error_type', 'algorithm')
+
+
+def run_case(case, error_rate=0.01, repeat=1):
+    """Run every stage of one case, returning one record per stage."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from QEC import CircuitManager, CircuitTemplate, SimulationManager, LoggingManager, Profiler
+
+    size, repetitions, error_type, algorithm = case
+    records = []
+
+    def timed(stage, function, shots=None, reset=None):
+        # reset runs untimed before every repeat, so a cached stage is timed cold each time
+        best = None
+        for _ in range(repeat):
+            if reset is not None:
+                reset()
+            start = time.perf_counter()
+            value = function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        peak_rss_mb = Profiler.peak_rss_mb()
+        records.append(dict(zip(CASE_FIELDS, case), stage=stage, seconds=round(best, 6),
+                            shots_per_sec=round(shots / best, 1) if shots and best else None,
+                            peak_rss_mb=None if peak_rss_mb is None else round(peak_rss_mb, 1)))
+        return value
+
+    def build():
+        circuit_manager = CircuitManager(size, error_rate, error_type, algorithm)
+        return circuit_manager.build_circuit()
+
+    circuit = timed("build", build, reset=CircuitTemplate.for_lattice.cache_clear)
+    simulation_manager = SimulationManager(circuit, repetitions, seed=0)
+    result = timed("simulate", simulation_manager.run_simulation, repetitions)
+    plt.close(timed("histogram", lambda: simulation_manager.visualize_measurement_results(result), repetitions))
+    plt.close(timed("lattice", lambda: simulation_manager.visualize_lattice(size, result),
+                    reset=lambda: setattr(simulation_manager, 'analysis', None)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'result.qecr')
+        timed("save", lambda: LoggingManager.log_simulation_results(simulation_manager.result_data, path), repetitions)
+        timed("load", lambda: LoggingManager.load_simulation_log(path).frame(), repetitions)
+    return records
+
+
+def run_cases(cases, error_rate=0.01, repeat=1, isolate=True):
+    """Run every case, each in a fresh child process when isolate is set and fork is available."""
+    if isolate and 'fork' in multiprocessing.get_all_start_methods():
+        # Import the core once so the forked children do not pay for it
+        import QEC  # noqa: F401
+        with multiprocessing.get_context('fork').Pool(1, maxtasksperchild=1) as pool:
+            for case in cases:
+                yield from pool.apply(run_case, (case, error_rate, repeat))
+        return
+    for case in cases:
+        yield from run_case(case, error_rate, repeat)
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.005):
+    """Return the results that are slower than their baseline entry by more than tolerance."""
+    def key(record):
+        return tuple(record[field] for field in CASE_FIELDS) + (record['stage'],)
+
+    reference = {key(record): record for record in baseline['results']}
+    regressions = []
+    for record in results:
+        previous = reference.get(key(record))
+        if previous is None:
+            continue
+        slowdown = record['seconds'] - previous['seconds']
+        if slowdown > min_seconds and record['seconds'] > previous['seconds'] * (1 + tolerance):
+            regressions.append(dict(record, baseline_seconds=previous['seconds']))
+    return regressions
+
+
+def environment():
+    import numpy
+    import cirq
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': numpy.__version__,
+        'cirq': cirq.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark circuit building, simulation, plotting and result I/O.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repetitions', type=int, nargs='+', default=REPETITIONS)
+    parser.add_argument('--error-types', nargs='+', choices=ERROR_TYPES, default=ERROR_TYPES)
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=ALGORITHMS)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=1, help="time each stage this many times and keep the fastest")
+    parser.add_argument('--quick', action='store_true', help="small grid for a fast smoke run")
+    parser.add_argument('--no-isolate', action='store_true', help="run all cases in this process")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--save-baseline', help="write the results as the new baseline file")
+    parser.add_argument('--baseline', help="compare against this baseline and exit with status 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown per stage")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.sizes, args.repetitions, args.error_types = [3, 5], [1000], ["Depolarizing"]
+    cases = list(itertools.product(args.sizes, args.repetitions, args.error_types, args.algorithms))
+
+    results = []
+    for record in run_cases(cases, args.error_rate, args.repeat, not args.no_isolate):
+        results.append(record)
+        rate = f"{record['shots_per_sec']:>12.0f}/s" if record['shots_per_sec'] else " " * 14
+        print(f"{record['size']:>3} {record['repetitions']:>8} {record['error_type']:<13}{record['algorithm']:<12}"
+              f"{record['stage']:<10}{record['seconds']:>10.4f}s {rate} {record['peak_rss_mb']} MiB", file=sys.stderr)
+
+    report = {'environment': environment(), 'error_rate': args.error_rate, 'results': results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for record in regressions:
+            print(f"REGRESSION size={record['size']} repetitions={record['repetitions']} {record['error_type']} "
+                  f"{record['algorithm']} {record['stage']}: {record['baseline_seconds']:.4f}s -> {record['seconds']:.4f}s",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
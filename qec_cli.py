@@ -0,0 +1,178 @@
+"""Headless command-line runner for batch jobs.
+
+Arguments and the optional JSON config file are parsed and validated before
+the simulation core (and with it cirq) is imported, so a bad job fails fast
+and nothing here needs PyQt5 or a display:
+
+    python qec_cli.py --size 7 --error-rate 0.01 --algorithm "Steane Code" --repetitions 100000 --seed 1 --output run.qecr
+    python qec_cli.py --size 7 --repetitions 10000000 --seed 1 --workers 8 --output big.qecr
+    python qec_cli.py --config job.json --seed 2
+    python qec_cli.py --config job.json --seed 2 --cache ~/.cache/qec-simulator
+"""
+import argparse
+import json
+import sys
+import time
+
+ERROR_TYPES = ("Bit-flip", "Phase-flip", "Depolarizing")
+ALGORITHMS = ("None", "Shor Code", "Steane Code", "Surface Code")
+BACKENDS = ("auto", "tableau", "frame", "statevector")
+
+DEFAULTS = {
+    'size': 5,
+    'error_rate': 0.1,
+    'error_type': "Depolarizing",
+    'algorithm': "None",
+    'repetitions': 1000,
+    'seed': None,
+    'backend': "auto",
+    'chunk_size': None,
+    'workers': 1,
+    'output': "results.qecr",
+    'profile': False,
+    'cache': None,
+    'cache_mb': 1024,
+    'logical_error_rate': False,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run a quantum error correction simulation without the GUI.")
+    parser.add_argument('--config', help="JSON file with any of the options below; flags override it")
+    parser.add_argument('--size', type=int, help="lattice size N of the NxN lattice (code distance for the surface code)")
+    parser.add_argument('--error-rate', type=float, help="error probability per qubit, 0 to 1")
+    parser.add_argument('--error-type', choices=ERROR_TYPES)
+    parser.add_argument('--algorithm', choices=ALGORITHMS)
+    parser.add_argument('--repetitions', type=int, help="number of shots")
+    parser.add_argument('--seed', type=int, help="seed for reproducible sampling")
+    parser.add_argument('--backend', choices=BACKENDS)
+    parser.add_argument('--chunk-size', type=int, help="report progress after chunks of at least this many shots; results do not depend on it")
+    parser.add_argument('--workers', type=int, help="simulate shards over this many processes; results do not depend on it")
+    parser.add_argument('--output', help="result file; .json writes the JSON export, anything else the binary format")
+    parser.add_argument('--profile', action='store_true', default=None,
+                        help="time each stage, print the breakdown and embed it in the result file")
+    parser.add_argument('--cache', help="directory of the result cache; repeated seeded runs are served from it")
+    parser.add_argument('--cache-mb', type=int, help="size limit of the result cache in MiB")
+    parser.add_argument('--logical-error-rate', action='store_true', default=None,
+                        help="also decode a separate batch of noise frames of the same size and report its logical error rate")
+    return parser
+
+
+def convert_config(parser, overrides):
+    """Convert config file values with the type of their flag, reporting bad values through the parser."""
+    actions = {action.dest: action for action in parser._actions}
+    converted = {}
+    for key, value in overrides.items():
+        action = actions[key]
+        if value is None and DEFAULTS[key] is None:
+            pass
+        elif action.type is not None:
+            # str() first, so 5.5 is rejected for an int just as "5.5" is on the command line
+            try:
+                value = action.type(str(value))
+            except ValueError:
+                parser.error(f"config key {key} must be {action.type.__name__}, not {value!r}")
+        elif action.nargs == 0:
+            if not isinstance(value, bool):
+                parser.error(f"config key {key} must be true or false, not {value!r}")
+        elif not isinstance(value, str):
+            parser.error(f"config key {key} must be a string, not {value!r}")
+        converted[key] = value
+    return converted
+
+
+def parse_config(argv=None):
+    """Merge defaults, the config file and command-line flags, then validate the result."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    config = dict(DEFAULTS)
+    if args.config:
+        try:
+            with open(args.config, 'r') as file:
+                overrides = json.load(file)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read config file: {e}")
+        unknown = set(overrides) - set(DEFAULTS)
+        if unknown:
+            parser.error(f"unknown config keys: {', '.join(sorted(unknown))}")
+        config.update(convert_config(parser, overrides))
+    config.update({key: value for key, value in vars(args).items() if key in DEFAULTS and value is not None})
+
+    if config['error_type'] not in ERROR_TYPES:
+        parser.error(f"error_type must be one of {', '.join(ERROR_TYPES)}")
+    if config['algorithm'] not in ALGORITHMS:
+        parser.error(f"algorithm must be one of {', '.join(ALGORITHMS)}")
+    if config['backend'] not in BACKENDS:
+        parser.error(f"backend must be one of {', '.join(BACKENDS)}")
+    if not 0 <= config['error_rate'] <= 1:
+        parser.error("error_rate must be between 0 and 1")
+    if config['size'] < 1 or config['repetitions'] < 1 or config['workers'] < 1:
+        parser.error("size, repetitions and workers must be positive")
+    if config['algorithm'] in ("Shor Code", "Steane Code") and config['size'] < 3:
+        parser.error(f"{config['algorithm']} needs a lattice of at least 3x3")
+    if config['algorithm'] == "Surface Code" and config['size'] < 2:
+        parser.error("Surface Code needs a lattice size (code distance) of at least 2")
+    if config['chunk_size'] is not None and config['chunk_size'] < 1:
+        parser.error("chunk_size must be positive")
+    if config['cache_mb'] < 1:
+        parser.error("cache_mb must be positive")
+    if config['cache'] and config['seed'] is None:
+        parser.error("cache needs a seed; unseeded runs draw fresh shots every time")
+    return config
+
+
+def run(config, log=sys.stderr):
+    """Build, simulate and save one configuration; return a summary of the run."""
+    # Deferred so that argument errors are reported before cirq loads
+    from QEC import CircuitManager, SimulationManager, LoggingManager, Profiler, ResultCache
+
+    start = time.perf_counter()
+    profiler = Profiler(enabled=config['profile'])
+    with profiler.span("build circuit"):
+        circuit_manager = CircuitManager(config['size'], config['error_rate'], config['error_type'], config['algorithm'])
+        circuit = circuit_manager.build_circuit()
+    parameters = {key: config[key] for key in ('size', 'error_rate', 'error_type', 'algorithm')}
+    cache = ResultCache(config['cache'], config['cache_mb'] * 2 ** 20) if config['cache'] else None
+    simulation_manager = SimulationManager(circuit, config['repetitions'], config['backend'], config['seed'], parameters,
+                                           profiler, cache, config['workers'])
+
+    if config['chunk_size']:
+        for done, _ in simulation_manager.run_in_chunks(config['chunk_size']):
+            print(f"{done}/{config['repetitions']} shots", file=log)
+    else:
+        simulation_manager.run_simulation()
+    if config['logical_error_rate']:
+        with profiler.span("logical errors", shots=config['repetitions']):
+            logical_error_rate = circuit_manager.logical_error_rate(config['repetitions'], config['seed'],
+                                                                    workers=config['workers'])
+
+    results = simulation_manager.result_data
+    if profiler.enabled:
+        results = dict(results, profile=profiler.records())
+    with profiler.span("save", shots=config['repetitions']):
+        LoggingManager.log_simulation_results(results, config['output'])
+    if profiler.enabled:
+        print(profiler.format_table(), file=log)
+
+    summary = {
+        'output': config['output'],
+        'shots': config['repetitions'],
+        'backend': type(simulation_manager.simulator).__name__,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    if config['logical_error_rate']:
+        summary['logical_error_rate'] = logical_error_rate
+    if profiler.enabled:
+        summary['profile'] = profiler.records()
+    return summary
+
+
+def main(argv=None):
+    config = parse_config(argv)
+    print(json.dumps(run(config)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
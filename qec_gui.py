@@ -0,0 +1,751 @@
+"""PyQt5 front end of the simulator; QEC.py holds the headless core."""
+import sys
+import time
+import matplotlib.pyplot as plt
+import cirq
+import pandas as pd
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QGridLayout, QFileDialog,
+    QMessageBox, QComboBox, QCheckBox, QScrollArea, QProgressBar
+)
+from PyQt5.QtCore import Qt, QObject, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.figure import Figure
+
+from QEC import CircuitManager, SimulationManager, SimulationLog, LoggingManager, Profiler, CircuitDiagram, ResultCache
+from qec_analysis import LatticeAnalysis
+
+
+class QuantumErrorCorrectionSoftware(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("QEC - Simulator")
+        self.setGeometry(100, 100, 1400, 1000) 
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        # Parameters
+        self.lattice_size = 5
+        self.error_rate = 0.1
+        self.error_type = "Depolarizing"
+        self.visualization_style = "Coolwarm"
+        self.error_correction_algorithm = "None"
+
+        self.selected_visualizations = {}
+
+        self.circuit_manager = None
+        self.simulation_manager = None
+        self.visualization_manager = None
+        self.simulation_thread = None
+        self.simulation_worker = None
+        self.profiler = Profiler(enabled=False)
+        self.result_cache = None
+
+        # GUI components
+        self.create_widgets()
+        self.visualization_manager = VisualizationManager(self.display_area)
+
+    def create_widgets(self):
+        self.title_label = QLabel("Quantum Error Correction Simulator", self)
+        self.title_label.setAlignment(Qt.AlignCenter)
+        self.title_label.setStyleSheet("font-size: 24px; font-weight: bold; padding: 10px; color: #34495E;")
+        self.layout.addWidget(self.title_label)
+
+        form_layout = QGridLayout()
+
+        # Parameters
+        form_layout.addWidget(QLabel("Lattice Size (NxN):"), 0, 0)
+        self.lattice_size_input = QLineEdit("5")
+        form_layout.addWidget(self.lattice_size_input, 0, 1)
+
+        form_layout.addWidget(QLabel("Error Rate (0 to 1):"), 1, 0)
+        self.error_rate_input = QLineEdit("0.1")
+        form_layout.addWidget(self.error_rate_input, 1, 1)
+
+        form_layout.addWidget(QLabel("Error Type:"), 2, 0)
+        self.error_type_combo = QComboBox()
+        self.error_type_combo.addItems(["Bit-flip", "Phase-flip", "Depolarizing"])
+        form_layout.addWidget(self.error_type_combo, 2, 1)
+
+        # Error visualization styles
+        form_layout.addWidget(QLabel("Visualization Style:"), 3, 0)
+        self.visualization_style_combo = QComboBox()
+        self.visualization_style_combo.addItems(["Coolwarm", "Viridis", "Plasma"])
+        form_layout.addWidget(self.visualization_style_combo, 3, 1)
+
+        # Error correction algorithms
+        form_layout.addWidget(QLabel("Error Correction Algorithm:"), 4, 0)
+        self.algorithm_combo = QComboBox()
+        self.algorithm_combo.addItems(["None", "Shor Code", "Steane Code", "Surface Code"])
+        form_layout.addWidget(self.algorithm_combo, 4, 1)
+
+        # A seed makes runs reproducible, and only seeded runs are cached
+        form_layout.addWidget(QLabel("Seed (optional):"), 5, 0)
+        self.seed_input = QLineEdit("")
+        self.seed_input.setPlaceholderText("random")
+        form_layout.addWidget(self.seed_input, 5, 1)
+
+        # Per-stage timing of each run, and reuse of earlier runs' shots
+        options_layout = QHBoxLayout()
+        self.profile_checkbox = QCheckBox('Profile Stages')
+        self.profile_checkbox.setChecked(True)
+        options_layout.addWidget(self.profile_checkbox)
+        self.cache_checkbox = QCheckBox('Cache Results')
+        self.cache_checkbox.setToolTip("Reuse the shots of earlier runs with the same seed")
+        options_layout.addWidget(self.cache_checkbox)
+        self.logical_checkbox = QCheckBox('Logical Error Rate')
+        self.logical_checkbox.setToolTip("Decode a separate batch of noise frames after the run")
+        options_layout.addWidget(self.logical_checkbox)
+        form_layout.addLayout(options_layout, 6, 1)
+
+        # Visualizations selection
+        form_layout.addWidget(QLabel("Visualizations:"), 7, 0)
+        self.visualization_options = {
+            'Lattice Before Error Correction': QCheckBox('Lattice Before Error Correction'),
+            'Measurement Results': QCheckBox('Measurement Results'),
+            'Lattice After Error Correction': QCheckBox('Lattice After Error Correction'),
+            'Qubit State Probabilities': QCheckBox('Qubit State Probabilities'),
+            'Circuit Diagram': QCheckBox('Circuit Diagram')
+        }
+        visualizations_layout = QVBoxLayout()
+        for checkbox in self.visualization_options.values():
+            checkbox.setChecked(True) 
+            visualizations_layout.addWidget(checkbox)
+        form_layout.addLayout(visualizations_layout, 7, 1)
+
+        self.layout.addLayout(form_layout)
+
+        # Run Simulation Button
+        self.run_button = QPushButton("Run Simulation", self)
+        self.run_button.clicked.connect(self.run_simulation)
+        self.layout.addWidget(self.run_button)
+
+        # Progress and cancellation of a running simulation
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar(self)
+        progress_layout.addWidget(self.progress_bar)
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_simulation)
+        progress_layout.addWidget(self.cancel_button)
+        self.layout.addLayout(progress_layout)
+
+        # Decoded logical error rate of the last run
+        self.logical_label = QLabel(self)
+        self.logical_label.setVisible(False)
+        self.layout.addWidget(self.logical_label)
+
+        # Stage timing breakdown of the last run
+        self.profile_label = QLabel(self)
+        self.profile_label.setStyleSheet("font-family: monospace;")
+        self.profile_label.setVisible(False)
+        self.layout.addWidget(self.profile_label)
+
+        # Load Simulation 
+        self.load_button = QPushButton("Load Simulation", self)
+        self.load_button.clicked.connect(self.load_simulation)
+        self.layout.addWidget(self.load_button)
+
+        # Save Simulation 
+        self.save_button = QPushButton("Save Simulation Results", self)
+        self.save_button.clicked.connect(self.save_simulation_results)
+        self.layout.addWidget(self.save_button)
+
+        # Display Area 
+        self.scroll_area = QScrollArea(self)
+        self.scroll_area.setWidgetResizable(True)
+        self.display_area = QWidget()
+        self.scroll_area.setWidget(self.display_area)
+        self.layout.addWidget(self.scroll_area)
+
+    def run_simulation(self):
+        try:
+            # Get user input
+            self.lattice_size = int(self.lattice_size_input.text())
+            self.error_rate = float(self.error_rate_input.text())
+            self.error_type = self.error_type_combo.currentText()
+            self.visualization_style = self.visualization_style_combo.currentText()
+            self.error_correction_algorithm = self.algorithm_combo.currentText()
+            self.seed = int(self.seed_input.text()) if self.seed_input.text().strip() else None
+
+            if not (0 <= self.error_rate <= 1):
+                raise ValueError("Error rate must be between 0 and 1.")
+            if self.seed is not None and self.seed < 0:
+                raise ValueError("Seed must be a non-negative integer.")
+        except ValueError as ve:
+            QMessageBox.warning(self, "Input Error", f"Invalid input: {ve}")
+            return
+
+        # Get visualization options
+        self.selected_visualizations = {name: checkbox.isChecked() for name, checkbox in self.visualization_options.items()}
+
+        # Keep the canvases of the selected visualizations; their artists are updated in place
+        self.visualization_manager.show_only([name for name, selected in self.selected_visualizations.items() if selected])
+        self.profiler = Profiler(enabled=self.profile_checkbox.isChecked())
+        self.visualization_manager.profiler = self.profiler
+        self.profile_label.setVisible(False)
+        if self.cache_checkbox.isChecked() and self.result_cache is None:
+            try:
+                self.result_cache = ResultCache()
+            except OSError as e:
+                QMessageBox.warning(self, "Cache Error", f"Results will not be cached: {e}")
+                self.cache_checkbox.setChecked(False)
+
+        # Build and simulate on a worker thread so the window stays responsive
+        self.stop_simulation_thread()
+        self.simulation_thread = QThread()
+        self.simulation_worker = SimulationWorker(self.lattice_size, self.error_rate, self.error_type,
+                                                  self.error_correction_algorithm, seed=self.seed, profiler=self.profiler,
+                                                  cache=self.result_cache if self.cache_checkbox.isChecked() else None,
+                                                  logical_errors=self.logical_checkbox.isChecked())
+        self.simulation_worker.moveToThread(self.simulation_thread)
+        self.simulation_thread.started.connect(self.simulation_worker.run)
+        self.simulation_worker.progress.connect(self.update_progress)
+        self.simulation_worker.partial_result.connect(self.show_partial_result)
+        self.simulation_worker.stage_finished.connect(self.show_stage_result)
+        self.simulation_worker.logical_error_rate.connect(self.show_logical_error_rate)
+        self.simulation_worker.failed.connect(self.show_simulation_error)
+        self.simulation_worker.finished.connect(self.simulation_finished)
+        self.simulation_worker.finished.connect(self.simulation_thread.quit)
+
+        self.run_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.logical_label.setVisible(False)
+        self.simulation_thread.start()
+
+    def stop_simulation_thread(self):
+        """Cancel any running worker and wait for its thread to exit."""
+        if self.simulation_thread is not None:
+            self.simulation_worker.cancel()
+            self.simulation_thread.quit()
+            self.simulation_thread.wait()
+
+    def closeEvent(self, event):
+        self.stop_simulation_thread()
+        super().closeEvent(event)
+
+    def cancel_simulation(self):
+        """Ask the running simulation to stop after its current chunk."""
+        if self.simulation_worker is not None:
+            self.simulation_worker.cancel()
+            self.cancel_button.setEnabled(False)
+
+    def update_progress(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+
+    def show_partial_result(self, stage, result):
+        """Refresh the measurement histogram while the post-correction run is still going."""
+        if stage == 'after' and self.selected_visualizations.get('Measurement Results', False):
+            # The last completed run stays current, so Save still has it if this one is cancelled
+            self.update_measurement_results(result, self.simulation_worker.simulation_manager, partial=True)
+
+    def update_measurement_results(self, result, simulation_manager, partial=False):
+        def draw(ax):
+            # Partial results keep the bars in place where they can, so most chunks only blit
+            in_place = simulation_manager.draw_measurement_results(ax, result, in_place=partial)
+            for artist in list(ax.patches) + [ax.title]:
+                artist.set_animated(partial)
+            return in_place
+
+        with self.profiler.span("histogram figure", shots=result.repetitions):
+            self.visualization_manager.update("Measurement Results", draw)
+
+    def update_lattice(self, title, result, stage):
+        lattice = self.simulation_manager.lattice_values(self.lattice_size, result, stage)
+        with self.profiler.span("lattice figure"):
+            self.visualization_manager.update(
+                title, lambda ax: self.simulation_manager.draw_lattice(ax, lattice, self.visualization_style))
+
+    def show_stage_result(self, stage, result):
+        """Render the visualizations for a finished stage."""
+        self.circuit_manager = self.simulation_worker.circuit_manager
+        self.simulation_manager = self.simulation_worker.simulation_manager
+
+        # Visualize the lattice before error correction (if selected)
+        if stage == 'before':
+            if self.selected_visualizations.get('Lattice Before Error Correction', False):
+                self.update_lattice("Lattice Before Error Correction", result, 'before')
+            return
+
+        # Visualize the results after error correction
+        if self.selected_visualizations.get('Measurement Results', False):
+            self.update_measurement_results(result, self.simulation_manager)
+
+        if self.selected_visualizations.get('Lattice After Error Correction', False):
+            self.update_lattice("Lattice After Error Correction", result, 'after')
+
+        # Visualize the circuit diagram
+        if self.selected_visualizations.get('Circuit Diagram', False):
+            with self.profiler.span("circuit figure"):
+                self.visualization_manager.display_circuit(self.circuit_manager.get_circuit(), title="Circuit Diagram")
+        self.update_profile_panel()
+
+    def update_profile_panel(self):
+        """Show the per-stage timing breakdown of the current run."""
+        if self.profiler.enabled and self.profiler.stages:
+            self.profile_label.setText(self.profiler.format_table())
+            self.profile_label.setVisible(True)
+
+    def show_logical_error_rate(self, rate, shots):
+        self.logical_label.setText(f"Logical error rate: {rate:.4f} (decoded over {shots} shots)")
+        self.logical_label.setVisible(True)
+
+    def show_simulation_error(self, message):
+        QMessageBox.warning(self, "Simulation Error", f"Simulation failed: {message}")
+
+    def simulation_finished(self, cancelled):
+        self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        if cancelled:
+            self.progress_bar.setValue(0)
+        self.update_profile_panel()
+
+    def apply_error_correction(self):
+        """Apply the selected error correction algorithm."""
+        self.circuit_manager.apply_error_correction()
+
+    def visualize_circuit_graphically(self, circuit, moments=None, qubits=None):
+        """Draw one page of the circuit diagram with the cached vector renderer."""
+        diagram = CircuitDiagram.for_circuit(circuit)
+        fig, ax = plt.subplots(figsize=(15, 6))
+        diagram.draw(ax, moments or (0, CircuitDiagramView.MOMENTS_PER_PAGE), qubits or (0, CircuitDiagramView.QUBITS_PER_PAGE))
+        return fig
+
+    def save_simulation_results(self):
+        """Save the results of the simulation as a binary result file or a JSON export."""
+        if self.simulation_manager and self.simulation_manager.result_data:
+            file_path, selected_filter = QFileDialog.getSaveFileName(
+                self, "Save Results", "", "QEC Results (*.qecr);;JSON Files (*.json)")
+            if file_path and not file_path.lower().endswith(('.qecr', '.json')):
+                file_path += '.json' if selected_filter.startswith('JSON') else '.qecr'
+            if file_path:
+                results = self.simulation_manager.result_data
+                profiler = self.simulation_manager.profiler
+                if profiler.enabled:
+                    # Include the drawing stages that ran after the results were stored
+                    results = dict(results, profile=profiler.records())
+                LoggingManager.log_simulation_results(results, file_path)
+                QMessageBox.information(self, "Save Success", "Simulation results saved successfully.")
+        else:
+            QMessageBox.warning(self, "No Results", "No simulation results to save.")
+
+    def load_simulation(self):
+        """Load and display results from a previous simulation."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Results", "", "Simulation Results (*.qecr *.json)")
+        if file_path:
+            try:
+                results = LoggingManager.load_simulation_log(file_path)
+                QMessageBox.information(self, "Load Success", "Simulation results loaded successfully.")
+                circuit = cirq.read_json(json_text=results['circuit'])
+                viewer = SimulationManager(circuit)
+                self.visualization_manager.display_circuit(circuit)
+                # Exports in the original {circuit, measurements} format have no parameters
+                size = results.get('parameters', {}).get('size', self.lattice_size)
+                if isinstance(results, SimulationLog):
+                    # Only the columns each plot needs are decoded from the memory-mapped file
+                    measurements = results.result()
+                    analysis = LatticeAnalysis.from_log(size, results)
+                else:
+                    measurements = pd.DataFrame(results['measurements'])
+                    analysis = LatticeAnalysis.from_frame(size, measurements)
+                lattice = analysis.flip_rates('before')
+                self.visualization_manager.update(
+                    "Measurement Results", lambda ax: viewer.draw_measurement_results(ax, measurements))
+                self.visualization_manager.update(
+                    "Lattice Before Error Correction", lambda ax: viewer.draw_lattice(ax, lattice, self.visualization_style))
+            except Exception as e:
+                QMessageBox.warning(self, "Load Error", f"Failed to load simulation: {e}")
+
+
+class SimulationWorker(QObject):
+    """Builds and simulates the circuit off the GUI thread.
+
+    Shots run in chunks; after each chunk progress and the partial result are
+    emitted, and cancel() takes effect at the next chunk boundary. Blocks are
+    as small as the chunks, so every chunk arrives on its own. With
+    logical_errors, a finished run also emits the decoded logical error rate
+    of a separate batch of the same size.
+    """
+
+    progress = pyqtSignal(int, int)
+    partial_result = pyqtSignal(str, object)
+    stage_finished = pyqtSignal(str, object)
+    logical_error_rate = pyqtSignal(float, int)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal(bool)
+
+    def __init__(self, size, error_rate, error_type, algorithm, repetitions=1000, chunk_size=128, seed=None,
+                 profiler=None, cache=None, logical_errors=False):
+        super().__init__()
+        self.size = size
+        self.error_rate = error_rate
+        self.error_type = error_type
+        self.algorithm = algorithm
+        self.repetitions = repetitions
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.cache = cache
+        self.logical_errors = logical_errors
+        self.circuit_manager = None
+        self.simulation_manager = None
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            # One circuit holds both the pre-correction (_step1) and post-correction (_step2)
+            # measurements, so a single pass yields the results of both stages
+            with self.profiler.span("build circuit"):
+                self.circuit_manager = CircuitManager(self.size, self.error_rate, self.error_type, self.algorithm)
+                circuit = self.circuit_manager.build_circuit()
+            parameters = dict(size=self.size, error_rate=self.error_rate, error_type=self.error_type, algorithm=self.algorithm)
+            self.simulation_manager = SimulationManager(circuit, self.repetitions, seed=self.seed, parameters=parameters,
+                                                        profiler=self.profiler, cache=self.cache,
+                                                        block_shots=self.chunk_size)
+            self.run_stages()
+        except Exception as e:
+            self.failed.emit(str(e))
+        self.finished.emit(self._cancelled)
+
+    def run_stages(self):
+        """Run the simulation in chunks; return False if it was cancelled."""
+        result = None
+        for done, result in self.simulation_manager.run_in_chunks(self.chunk_size):
+            self.progress.emit(done, self.repetitions)
+            self.partial_result.emit('after', result)
+            if self._cancelled:
+                return False
+        self.stage_finished.emit('before', result)
+        self.stage_finished.emit('after', result)
+        if self.logical_errors:
+            with self.profiler.span("logical errors", shots=self.repetitions):
+                rate = self.circuit_manager.logical_error_rate(self.repetitions, self.seed)
+            self.logical_error_rate.emit(rate, self.repetitions)
+        return True
+
+
+class LazyCanvas(FigureCanvas):
+    """A canvas that renders only when Qt paints it, so off-screen canvases stay idle.
+
+    request_draw() marks the figure stale and schedules a repaint. Qt only
+    delivers paint events to widgets inside the scroll area's viewport, so a
+    canvas scrolled out of view renders when it next comes into view. Repaints
+    are spaced at least MIN_INTERVAL seconds apart, so a stream of partial
+    results does not queue one full render per chunk.
+
+    Artists marked animated are left out of the cached background, and
+    request_blit() redraws only them over it. Every render refreshes the
+    background, including the ones Qt triggers on a resize. Pop-out windows
+    that show the same buffer are repainted after every render.
+    """
+
+    MIN_INTERVAL = 0.5
+
+    def __init__(self, figure, manager=None):
+        super().__init__(figure)
+        self.manager = manager
+        self.stale = True
+        self.mirrors = []
+        self.background = None
+        self.last_render = 0.0
+        self.repaint_pending = False
+
+    def request_draw(self):
+        self.stale = True
+        wait = self.last_render + self.MIN_INTERVAL - time.perf_counter()
+        if wait <= 0:
+            self.schedule_paint()
+        elif not self.repaint_pending:
+            self.repaint_pending = True
+            QTimer.singleShot(int(wait * 1000) + 1, self.schedule_paint)
+
+    def request_blit(self):
+        """Redraw only the animated artists over the cached background."""
+        if self.stale or self.background is None:
+            self.request_draw()
+            return
+        self.restore_region(self.background)
+        self.draw_animated()
+        self.schedule_paint()
+
+    def schedule_paint(self):
+        self.repaint_pending = False
+        self.update()
+        for mirror in self.mirrors:
+            mirror.update()
+
+    def draw_animated(self):
+        for artist in self.figure.findobj(lambda artist: artist.get_animated()):
+            self.figure.draw_artist(artist)
+
+    def draw(self):
+        super().draw()
+        self.background = self.copy_from_bbox(self.figure.bbox)
+        self.draw_animated()
+
+    def ensure_drawn(self):
+        """Render the figure now if it changed since the last render."""
+        if self.stale:
+            self.stale = False
+            profiler = self.manager.profiler if self.manager is not None else Profiler(enabled=False)
+            with profiler.span("draw canvas"):
+                self.draw()
+            self.last_render = time.perf_counter()
+
+    def resizeEvent(self, event):
+        # The background has the old size until the render this resize schedules
+        self.background = None
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        self.ensure_drawn()
+        super().paintEvent(event)
+
+
+class FigureSlot(QWidget):
+    """Persistent canvas and Pop Out button for one named visualization."""
+
+    def __init__(self, manager, title):
+        super().__init__()
+        self.manager = manager
+        self.title = title
+        self.figure = Figure(figsize=(12, 6))
+        self.ax = self.figure.add_subplot()
+        self.canvas = LazyCanvas(self.figure, manager)
+        self.canvas.setMinimumHeight(400)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        layout.addWidget(self.canvas)
+        pop_out_button = QPushButton("Pop Out")
+        layout.addWidget(pop_out_button)
+        pop_out_button.clicked.connect(lambda: self.manager.pop_out_figure(self, self.title))
+
+    def set_figure(self, fig):
+        """Show a ready-made figure in this slot's canvas."""
+        width, height = self.figure.get_size_inches()
+        fig.set_size_inches(width, height, forward=False)
+        fig.set_canvas(self.canvas)
+        self.canvas.figure = fig
+        self.figure = fig
+        self.ax = fig.axes[0] if fig.axes else fig.add_subplot()
+        self.canvas.request_draw()
+
+
+class VisualizationManager:
+    """Keeps one persistent slot per visualization and updates its artists in place."""
+
+    def __init__(self, display_area):
+        self.display_area = display_area
+        self.ensure_layout()
+        self.pop_out_windows = []
+        self.profiler = Profiler(enabled=False)
+        self.slots = {}
+        self.circuit_view = None
+
+    def ensure_layout(self):
+        """Ensure the display area has a layout."""
+        if self.display_area.layout() is None:
+            self.display_area.setLayout(QVBoxLayout())
+
+    def slot(self, title):
+        """Return the slot for a visualization, creating it the first time."""
+        if title not in self.slots:
+            self.ensure_layout()
+            self.slots[title] = FigureSlot(self, title)
+            self.display_area.layout().addWidget(self.slots[title])
+        slot = self.slots[title]
+        slot.setVisible(True)
+        return slot
+
+    def show_only(self, titles):
+        """Hide the slots that the next run will not update."""
+        for title, slot in self.slots.items():
+            slot.setVisible(title in titles)
+        if self.circuit_view is not None:
+            self.circuit_view.parentWidget().setVisible("Circuit Diagram" in titles)
+
+    def update(self, title, draw):
+        """Call draw(ax) on a slot's persistent axis and schedule a repaint.
+
+        If draw returns True, only the axis' animated artists changed and the
+        canvas blits them instead of rendering the whole figure.
+        """
+        slot = self.slot(title)
+        if draw(slot.ax) is True:
+            slot.canvas.request_blit()
+        else:
+            slot.canvas.request_draw()
+        return slot.canvas
+
+    def display_figure(self, fig, title="Figure"):
+        """Display a matplotlib figure in the PyQt5 window."""
+        slot = self.slot(title)
+        slot.set_figure(fig)
+        plt.close(fig)
+        return slot.canvas
+
+    def display_circuit(self, circuit, title="Circuit Diagram"):
+        """Display a pageable circuit diagram; pop-outs share its cached layout."""
+        diagram = CircuitDiagram.for_circuit(circuit)
+        if self.circuit_view is not None:
+            self.circuit_view.set_diagram(diagram)
+            self.circuit_view.parentWidget().setVisible(True)
+            return self.circuit_view
+
+        self.ensure_layout()
+        self.circuit_view = CircuitDiagramView(diagram, self)
+        container_widget = QWidget()
+        container_layout = QVBoxLayout()
+        container_widget.setLayout(container_layout)
+        container_layout.addWidget(self.circuit_view)
+
+        pop_out_button = QPushButton("Pop Out")
+        container_layout.addWidget(pop_out_button)
+        pop_out_button.clicked.connect(lambda: self.pop_out_circuit(self.circuit_view.diagram, title))
+
+        self.display_area.layout().addWidget(container_widget)
+        return self.circuit_view
+
+    def pop_out_circuit(self, diagram, title="Circuit Diagram"):
+        """Open the circuit diagram in its own window."""
+        pop_out_window = CircuitDiagramView(diagram, self)
+        pop_out_window.setWindowTitle(title)
+        pop_out_window.show()
+        self.pop_out_windows.append(pop_out_window)
+
+    def pop_out_figure(self, slot, title="Figure"):
+        """Open a window that mirrors a slot's rendered buffer."""
+        pop_out_window = FigureWindow(slot, title)
+        pop_out_window.show()
+        self.pop_out_windows.append(pop_out_window)
+
+
+class FigureWindow(QWidget):
+    """Pop-out view of a slot. It paints the slot canvas's rendered buffer
+    instead of rendering the figure a second time."""
+
+    def __init__(self, slot, title="Figure"):
+        super().__init__()
+        self.setWindowTitle(title)
+        self.canvas = slot.canvas
+        self.canvas.mirrors.append(self)
+        self.resize(self.canvas.width() or 1200, self.canvas.height() or 600)
+
+    def paintEvent(self, event):
+        self.canvas.ensure_drawn()
+        buffer = self.canvas.buffer_rgba()
+        image = QImage(buffer, buffer.shape[1], buffer.shape[0], QImage.Format_RGBA8888)
+        scaled = image.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        painter.drawImage((self.width() - scaled.width()) // 2, (self.height() - scaled.height()) // 2, scaled)
+        painter.end()
+
+    def closeEvent(self, event):
+        if self in self.canvas.mirrors:
+            self.canvas.mirrors.remove(self)
+        super().closeEvent(event)
+
+
+class CircuitDiagramView(QWidget):
+    """Pages and zooms through a CircuitDiagram.
+
+    Only the visible window of moments and qubits is drawn. The layout comes
+    from the diagram's cache, so changing page never re-lays out the circuit.
+    """
+
+    MOMENTS_PER_PAGE = 40
+    QUBITS_PER_PAGE = 40
+    PAGE_SIZES = ["20", "40", "80", "All"]
+
+    def __init__(self, diagram, manager=None):
+        super().__init__()
+        self.diagram = diagram
+        self.moment_start = 0
+        self.qubit_start = 0
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+        self.canvas = LazyCanvas(Figure(figsize=(15, 6)), manager)
+        self.canvas.setMinimumHeight(450)
+        self.layout.addWidget(NavigationToolbar(self.canvas, self))
+        self.layout.addWidget(self.canvas)
+
+        controls = QHBoxLayout()
+        self.previous_moments = QPushButton("< Moments")
+        self.previous_moments.clicked.connect(lambda: self.move(moments=-1))
+        self.next_moments = QPushButton("Moments >")
+        self.next_moments.clicked.connect(lambda: self.move(moments=1))
+        self.previous_qubits = QPushButton("< Qubits")
+        self.previous_qubits.clicked.connect(lambda: self.move(qubits=-1))
+        self.next_qubits = QPushButton("Qubits >")
+        self.next_qubits.clicked.connect(lambda: self.move(qubits=1))
+        self.moments_combo = QComboBox()
+        self.moments_combo.addItems(self.PAGE_SIZES)
+        self.moments_combo.setCurrentText(str(self.MOMENTS_PER_PAGE))
+        self.moments_combo.currentTextChanged.connect(lambda _: self.move())
+        self.qubits_combo = QComboBox()
+        self.qubits_combo.addItems(self.PAGE_SIZES)
+        self.qubits_combo.setCurrentText(str(self.QUBITS_PER_PAGE))
+        self.qubits_combo.currentTextChanged.connect(lambda _: self.move())
+        for widget in (self.previous_moments, self.next_moments, QLabel("Moments per page:"), self.moments_combo,
+                       self.previous_qubits, self.next_qubits, QLabel("Qubits per page:"), self.qubits_combo):
+            controls.addWidget(widget)
+        self.layout.addLayout(controls)
+        self.render()
+
+    def set_diagram(self, diagram):
+        """Show another circuit from its first page."""
+        self.diagram = diagram
+        self.moment_start = self.qubit_start = 0
+        self.render()
+
+    @staticmethod
+    def page_size(combo, total):
+        return total if combo.currentText() == "All" else int(combo.currentText())
+
+    @staticmethod
+    def clamp(start, page, total):
+        """Keep a window start on the circuit, at 0 when one page shows everything."""
+        return 0 if page >= total else min(max(0, start), total - 1)
+
+    def move(self, moments=0, qubits=0):
+        """Step the visible window by whole pages and redraw."""
+        moment_page = self.page_size(self.moments_combo, self.diagram.num_moments)
+        qubit_page = self.page_size(self.qubits_combo, len(self.diagram.qubits))
+        self.moment_start = self.clamp(self.moment_start + moments * moment_page, moment_page, self.diagram.num_moments)
+        self.qubit_start = self.clamp(self.qubit_start + qubits * qubit_page, qubit_page, len(self.diagram.qubits))
+        self.render()
+
+    def render(self):
+        moment_page = self.page_size(self.moments_combo, self.diagram.num_moments)
+        qubit_page = self.page_size(self.qubits_combo, len(self.diagram.qubits))
+        figure = self.canvas.figure
+        figure.clear()
+        ax = figure.add_subplot()
+        self.diagram.draw(ax, (self.moment_start, self.moment_start + moment_page),
+                          (self.qubit_start, self.qubit_start + qubit_page))
+        self.previous_moments.setEnabled(self.moment_start > 0)
+        self.next_moments.setEnabled(self.moment_start + moment_page < self.diagram.num_moments)
+        self.previous_qubits.setEnabled(self.qubit_start > 0)
+        self.next_qubits.setEnabled(self.qubit_start + qubit_page < len(self.diagram.qubits))
+        self.canvas.request_draw()
+
+
+def main():
+    app = QApplication(sys.argv)
+    window = QuantumErrorCorrectionSoftware()
+    window.show()
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""Tests of the samplers, decoders, result files and seeded runs; run with pytest."""
+import cirq
+import numpy as np
+import pandas as pd
+import pytest
+
+from QEC import (CircuitManager, SimulationManager, PauliFrameSimulator, TableauSimulator, LookupTableDecoder,
+                 UnionFindDecoder, OutcomeHistogram, SimulationLog, LoggingManager, ResultCache)
+from qec_analysis import LatticeAnalysis
+
+
+def grid_circuit(noise=None):
+    """A 3x3 grid of GHZ columns, undone after an optional noise layer so that flips become visible.
+
+    Rows 1 and 2 then read the bit flip parities of each column in a
+    mid-circuit measurement, and row 0 reads its phase flips after an H. An S,
+    a CZ and a reset exercise the remaining gates.
+    """
+    q = [[cirq.GridQubit(i, j) for j in range(3)] for i in range(3)]
+    circuit = cirq.Circuit(
+        cirq.Moment(cirq.H(qubit) for qubit in q[0]),
+        cirq.Moment(cirq.CNOT(q[0][j], q[1][j]) for j in range(3)),
+        cirq.Moment(cirq.CNOT(q[1][j], q[2][j]) for j in range(3)),
+    )
+    if noise is not None:
+        circuit.append(cirq.Moment(noise.on(qubit) for row in q for qubit in row))
+    circuit.append([
+        cirq.Moment(cirq.CNOT(q[1][j], q[2][j]) for j in range(3)),
+        cirq.Moment(cirq.CNOT(q[0][j], q[1][j]) for j in range(3)),
+        cirq.Moment(cirq.measure(*q[1], *q[2], key='parities')),
+        cirq.Moment([cirq.S(q[0][1]), cirq.reset(q[2][0]), cirq.reset(q[2][1]), cirq.CZ(q[0][2], q[1][2])]),
+        cirq.Moment([cirq.H(q[0][0]), cirq.H(q[0][1]), cirq.H(q[0][2]), cirq.H(q[2][0])]),
+        cirq.Moment(cirq.CNOT(q[2][0], q[2][1])),
+        cirq.Moment(cirq.measure(*[qubit for row in q for qubit in row], key='grid')),
+    ])
+    return circuit
+
+
+def parity_rates(result):
+    """Rate of every measured bit and of the XOR of every pair of bits, in key order."""
+    bits = np.concatenate([result.records[key][:, -1, :] for key in sorted(result.records)], axis=1).astype(bool)
+    pairs = (bits[:, :, None] ^ bits[:, None, :]).mean(axis=0)
+    return np.concatenate([bits.mean(axis=0), pairs[np.triu_indices(bits.shape[1], 1)]])
+
+
+def assert_same_statistics(result, reference):
+    """Every rate agrees within five binomial standard deviations; certain outcomes agree exactly."""
+    a, b = parity_rates(result), parity_rates(reference)
+    n_a, n_b = result.repetitions, reference.repetitions
+    pooled = (a * n_a + b * n_b) / (n_a + n_b)
+    sigma = np.sqrt(pooled * (1 - pooled) * (1 / n_a + 1 / n_b))
+    assert np.all(np.abs(a - b) <= 5 * sigma + 1e-12)
+
+
+def test_frame_sampler_matches_state_vector():
+    circuit = grid_circuit(cirq.asymmetric_depolarize(0.05, 0.03, 0.08))
+    assert PauliFrameSimulator.supports(circuit) and not TableauSimulator.supports(circuit)
+    frames = PauliFrameSimulator(1).run(circuit, repetitions=20000)
+    assert_same_statistics(frames, cirq.Simulator(seed=1).run(circuit, repetitions=2000))
+
+
+def test_tableau_sampler_matches_state_vector():
+    circuit = grid_circuit()
+    assert TableauSimulator.supports(circuit)
+    tableau = TableauSimulator(1).run(circuit, repetitions=20000)
+    assert_same_statistics(tableau, cirq.Simulator(seed=1).run(circuit, repetitions=1000))
+
+
+@pytest.mark.parametrize('code', ["Shor Code", "Steane Code"])
+@pytest.mark.parametrize('error', ['X', 'Z'])
+def test_lookup_decoder_corrects_single_flips(code, error):
+    decoder = LookupTableDecoder.for_code(code, error)
+    num_qubits = decoder.checks.shape[1]
+    readout = np.vstack([np.zeros(num_qubits, dtype=bool), np.eye(num_qubits, dtype=bool)])
+    recoveries, logical_errors = decoder.decode_batch(readout)
+    # The recovery clears the syndrome and leaves no logical error
+    assert not (((readout ^ recoveries).astype(np.uint8) @ decoder.checks.T) % 2).any()
+    assert not logical_errors.any()
+
+
+def test_lookup_decoder_flags_uncorrectable_flips():
+    steane = LookupTableDecoder.for_code("Steane Code", 'X')
+    assert steane.decode_batch([[1, 1, 0, 0, 0, 0, 0]])[1].all()
+
+    # Two phase flips in one block of the Shor code are a stabilizer, in two blocks a logical error
+    shor = LookupTableDecoder.for_code("Shor Code", 'Z')
+    readout = np.zeros((2, 9), dtype=bool)
+    readout[0, [0, 1]] = True
+    readout[1, [0, 3]] = True
+    assert shor.decode_batch(readout)[1].tolist() == [False, True]
+
+
+def test_union_find_decoder_corrects_single_faults():
+    manager = CircuitManager(3, 0.01, "Bit-flip", "Surface Code")
+    manager.build_circuit()
+    num_detectors, edges = manager.surface_code_decoding_graph()
+    decoder = UnionFindDecoder(num_detectors, edges)
+
+    # One fault per edge: a data qubit flip or a flipped stabilizer readout
+    detectors = np.zeros((len(edges), num_detectors), dtype=bool)
+    for row, (u, v, _) in enumerate(edges):
+        detectors[row, [node for node in (u, v) if node != num_detectors]] = True
+    expected = np.array([flips for _, _, flips in edges])
+    assert np.array_equal(decoder.decode_batch(detectors), expected)
+    assert not decoder.decode_batch(np.zeros((1, num_detectors), dtype=bool)).any()
+
+
+@pytest.mark.parametrize('size', [3, 5])
+def test_streamed_detection_events_match_the_unrolled_circuit(size):
+    manager = CircuitManager(size, 0.02, "Depolarizing", "Surface Code", rounds=6)
+    manager.build_circuit()
+    flips = PauliFrameSimulator(7).sample_packed(manager.circuit, 500, flips_only=True)
+    detectors, logical_flips = manager.surface_code_detection_events(flips, 500)
+
+    chunks = []
+    streamed = manager.stream_detection_events(PauliFrameSimulator(7), 500, lambda first, events: chunks.append((first, events)),
+                                               chunk_rounds=4)
+    # Rounds 0-3, then rounds 4-5 with the final data readout layer
+    assert [(first, len(events)) for first, events in chunks] == [(0, 4), (4, 3)]
+    events = np.unpackbits(np.concatenate([events for _, events in chunks]), axis=-1, count=500, bitorder='little')
+    assert np.array_equal(events.reshape(-1, 500).T.astype(bool), detectors)
+    assert np.array_equal(np.unpackbits(streamed, count=500, bitorder='little').astype(bool), logical_flips)
+
+
+def test_phase_flips_count_as_logical_errors():
+    for algorithm in ("None", "Shor Code", "Steane Code"):
+        manager = CircuitManager(3, 0.2, "Phase-flip", algorithm)
+        manager.build_circuit()
+        assert manager.logical_error_rate(2000, seed=1) > 0
+
+
+def test_logical_error_rate_does_not_depend_on_workers():
+    manager = CircuitManager(3, 0.1, "Depolarizing", "Steane Code")
+    manager.build_circuit()
+    rate = manager.logical_error_rate(3000, seed=2, batch_shots=1000)
+    assert rate == manager.logical_error_rate(3000, seed=2, batch_shots=1000, workers=2)
+
+
+@pytest.mark.parametrize('extension', ['.qecr', '.json'])
+def test_result_file_round_trip(tmp_path, extension):
+    circuit = CircuitManager(3, 0.1, "Depolarizing", "Steane Code").build_circuit()
+    manager = SimulationManager(circuit, 1000, seed=3, parameters={'size': 3})
+    result = manager.run_simulation()
+    path = str(tmp_path / f'result{extension}')
+    LoggingManager.log_simulation_results(manager.result_data, path)
+
+    loaded = LoggingManager.load_simulation_log(path)
+    assert cirq.read_json(json_text=loaded['circuit']) == circuit
+    assert loaded['parameters']['size'] == 3 and loaded['seed'] == 3
+    if extension == '.qecr':
+        assert isinstance(loaded, SimulationLog) and loaded.shots == 1000
+        assert loaded.get('parameters', {})['size'] == 3 and loaded.get('missing') is None
+        for key, values in result.records.items():
+            assert np.array_equal(loaded.bits(key), values[:, -1, :])
+        frame = loaded.frame()
+    else:
+        frame = pd.DataFrame(loaded['measurements'])
+        frame.index = frame.index.astype(int)
+    pd.testing.assert_frame_equal(frame[sorted(frame)], result.data[sorted(result.data)], check_dtype=False)
+
+
+def test_wide_keys_round_trip(tmp_path):
+    bits = np.random.default_rng(0).integers(0, 2, size=(20, 80), dtype=np.int8)
+    path = str(tmp_path / 'wide.qecr')
+    SimulationLog.write({'circuit': cirq.to_json(cirq.Circuit()), 'records': {'syndrome': bits}}, path)
+    log = SimulationLog(path)
+    column = log.column('syndrome')
+    assert column.tolist() == [cirq.big_endian_bits_to_int(row) for row in bits]
+    labels = [label for label, _ in OutcomeHistogram.from_frame(log.frame()).most_common()]
+    assert sorted(labels) == sorted(str(value) for value in column)
+    assert OutcomeHistogram.from_result(log.result()).most_common() == OutcomeHistogram.from_frame(log.frame()).most_common()
+
+
+def test_lattice_analysis_matches_numpy():
+    size, shots = 3, 500
+    rng = np.random.default_rng(1)
+    before = rng.random((shots, size * size)) < np.linspace(0.1, 0.6, size * size)
+    before[:, 1] ^= before[:, 0] & (rng.random(shots) < 0.5)
+    after = before ^ (rng.random((shots, size * size)) < 0.1)
+    records = {f'm{index}_{step}': bits[:, None, index:index + 1].astype(np.int8)
+               for step, bits in (('step1', before), ('step2', after)) for index in range(size * size)}
+    analysis = LatticeAnalysis.from_result(size, cirq.ResultDict(records=records))
+
+    assert np.array_equal(analysis.bits('after').reshape(shots, -1), after)
+    assert np.allclose(analysis.flip_rates('before'), before.mean(axis=0).reshape(size, size))
+    assert np.allclose(analysis.correction_delta(), (after.mean(axis=0) - before.mean(axis=0)).reshape(size, size))
+    assert np.allclose(analysis.changed_rates(), (before ^ after).mean(axis=0).reshape(size, size))
+    assert np.allclose(analysis.correlations('before'), np.corrcoef(before.T))
+
+    full = np.corrcoef(after.T)
+    horizontal, vertical = analysis.neighbour_correlations('after')
+    assert np.allclose(horizontal, [[full[i * size + j, i * size + j + 1] for j in range(size - 1)] for i in range(size)])
+    assert np.allclose(vertical, [[full[i * size + j, (i + 1) * size + j] for j in range(size)] for i in range(size - 1)])
+
+
+def records(result):
+    return {key: values.copy() for key, values in result.records.items()}
+
+
+def assert_same_records(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        assert np.array_equal(a[key], b[key]), key
+
+
+@pytest.fixture(scope='module')
+def circuit():
+    return CircuitManager(3, 0.05, "Depolarizing", "Steane Code").build_circuit()
+
+
+def test_seeded_runs_do_not_depend_on_workers_or_chunks(circuit):
+    reference = records(SimulationManager(circuit, 3000, seed=5, block_shots=256).run_simulation())
+    pooled = SimulationManager(circuit, 3000, seed=5, block_shots=256, workers=3, shard_blocks=2)
+    assert_same_records(reference, records(pooled.run_simulation()))
+    chunks = list(SimulationManager(circuit, 3000, seed=5, block_shots=256, workers=2).run_in_chunks(700))
+    assert [done for done, _ in chunks] == [768, 1536, 2304, 3000]
+    assert_same_records(reference, records(chunks[-1][1]))
+
+    prefix = records(SimulationManager(circuit, 1000, seed=5, block_shots=256).run_simulation())
+    assert_same_records(prefix, {key: values[:1000] for key, values in reference.items()})
+
+
+def test_cached_runs_match_uncached_runs(circuit, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    reference = records(SimulationManager(circuit, 3000, seed=5, block_shots=256).run_simulation())
+    # A first entry, a prefix of it, a top-up and an exact hit
+    for repetitions in (1000, 500, 3000, 3000):
+        result = SimulationManager(circuit, repetitions, seed=5, cache=cache, block_shots=256).run_simulation()
+        assert_same_records(records(result), {key: values[:repetitions] for key, values in reference.items()})
+    assert len(cache.entries()) == 1
+
+
+def test_unseeded_runs_bypass_the_cache(circuit, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    first = records(SimulationManager(circuit, 1000, cache=cache).run_simulation())
+    second = records(SimulationManager(circuit, 1000, cache=cache).run_simulation())
+    assert not cache.entries()
+    assert any(not np.array_equal(first[key], second[key]) for key in first)
+
+
+def test_state_vector_and_unseeded_runs_stop_at_the_repetitions(tmp_path):
+    circuit = grid_circuit(cirq.depolarize(0.1))
+    for seed, backend in ((None, 'frame'), (None, 'statevector'), (4, 'statevector')):
+        manager = SimulationManager(circuit, 100, backend, seed=seed, block_shots=64)
+        manager.simulator = manager.select_simulator()
+        assert [manager.shard_shots(blocks) for blocks in manager.shard_plan(0, 2, 1)] == [64, 36]
+
+    # The short last block is simulated again rather than served from the cache
+    cache = ResultCache(str(tmp_path))
+    reference = records(SimulationManager(circuit, 100, 'statevector', seed=4, block_shots=64).run_simulation())
+    for repetitions in (80, 100):
+        SimulationManager(circuit, repetitions, 'statevector', seed=4, cache=cache, block_shots=64).run_simulation()
+    assert_same_records(reference, records(SimulationManager(circuit, 100, 'statevector', seed=4, cache=cache,
+                                                             block_shots=64).run_simulation()))